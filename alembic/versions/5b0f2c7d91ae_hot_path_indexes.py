@@ -0,0 +1,57 @@
+"""hot path indexes
+
+Revision ID: 5b0f2c7d91ae
+Revises: 9e221588236c
+Create Date: 2026-10-17 12:40:11.402518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0f2c7d91ae'
+down_revision: Union[str, None] = '9e221588236c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Edges carry their graph so graph reads can filter topic_connections directly
+    op.add_column('topic_connections', sa.Column('graph_id', sa.UUID(), nullable=True))
+    op.execute(
+        "UPDATE topic_connections AS c SET graph_id = t.graph_id "
+        "FROM topics AS t WHERE t.id = c.from_topic_id"
+    )
+    op.alter_column('topic_connections', 'graph_id', nullable=False)
+    op.create_foreign_key(
+        'topic_connections_graph_id_fkey', 'topic_connections', 'knowledge_graphs',
+        ['graph_id'], ['id']
+    )
+
+    # Keep one row per (from, to) so the unique index can be built
+    op.execute(
+        "DELETE FROM topic_connections AS a USING topic_connections AS b "
+        "WHERE a.from_topic_id = b.from_topic_id AND a.to_topic_id = b.to_topic_id AND a.id > b.id"
+    )
+
+    op.create_index('ix_topics_graph_id_name', 'topics', ['graph_id', 'name'])
+    op.create_index('ix_topic_connections_graph_id', 'topic_connections', ['graph_id'])
+    op.create_index(
+        'uq_topic_connections_from_to', 'topic_connections',
+        ['from_topic_id', 'to_topic_id'], unique=True
+    )
+    op.create_index('ix_user_knowledge_user_id_topic_id', 'user_knowledge', ['user_id', 'topic_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_knowledge_user_id_topic_id', table_name='user_knowledge')
+    op.drop_index('uq_topic_connections_from_to', table_name='topic_connections')
+    op.drop_index('ix_topic_connections_graph_id', table_name='topic_connections')
+    op.drop_index('ix_topics_graph_id_name', table_name='topics')
+    op.drop_constraint('topic_connections_graph_id_fkey', 'topic_connections', type_='foreignkey')
+    op.drop_column('topic_connections', 'graph_id')
@@ -0,0 +1,82 @@
+"""topic closure
+
+Revision ID: a6d2e9f4b813
+Revises: f3b8c1d6a294
+Create Date: 2026-10-17 14:48:19.530271
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2e9f4b813'
+down_revision: Union[str, None] = 'f3b8c1d6a294'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('topic_closure',
+    sa.Column('graph_id', sa.UUID(), nullable=False),
+    sa.Column('ancestor_id', sa.UUID(), nullable=False),
+    sa.Column('descendant_id', sa.UUID(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['graph_id'], ['knowledge_graphs.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['topics.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['topics.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index(
+        'ix_topic_closure_descendant_id_ancestor_id', 'topic_closure', ['descendant_id', 'ancestor_id']
+    )
+    op.create_index('ix_topic_closure_graph_id', 'topic_closure', ['graph_id'])
+
+    # Seed graph by graph with a BFS from every topic: one row per (ancestor, descendant)
+    # at its shortest depth, never more than the graph's own closure in memory
+    conn = op.get_bind()
+    topics = sa.table('topics', sa.column('id'), sa.column('graph_id'))
+    connections = sa.table(
+        'topic_connections', sa.column('graph_id'), sa.column('from_topic_id'), sa.column('to_topic_id')
+    )
+    closure = sa.table(
+        'topic_closure', sa.column('graph_id'), sa.column('ancestor_id'), sa.column('descendant_id'),
+        sa.column('depth')
+    )
+    graph_ids = conn.execute(sa.select(topics.c.graph_id).distinct()).scalars().all()
+    for graph_id in graph_ids:
+        children = defaultdict(list)
+        for src, dst in conn.execute(
+            sa.select(connections.c.from_topic_id, connections.c.to_topic_id)
+            .where(connections.c.graph_id == graph_id)
+        ):
+            children[src].append(dst)
+        rows = []
+        for topic_id in conn.execute(sa.select(topics.c.id).where(topics.c.graph_id == graph_id)).scalars():
+            depths = {topic_id: 0}
+            frontier = [topic_id]
+            while frontier:
+                reached = []
+                for node in frontier:
+                    for nxt in children.get(node, ()):
+                        if nxt not in depths:
+                            depths[nxt] = depths[node] + 1
+                            reached.append(nxt)
+                frontier = reached
+            rows.extend(
+                {'graph_id': graph_id, 'ancestor_id': topic_id, 'descendant_id': d, 'depth': depth}
+                for d, depth in depths.items()
+            )
+        if rows:
+            conn.execute(closure.insert(), rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_topic_closure_graph_id', table_name='topic_closure')
+    op.drop_index('ix_topic_closure_descendant_id_ancestor_id', table_name='topic_closure')
+    op.drop_table('topic_closure')
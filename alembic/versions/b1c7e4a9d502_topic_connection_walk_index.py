@@ -0,0 +1,33 @@
+"""topic connection walk index
+
+Revision ID: b1c7e4a9d502
+Revises: a6d2e9f4b813
+Create Date: 2026-10-17 15:32:40.118264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1c7e4a9d502'
+down_revision: Union[str, None] = 'a6d2e9f4b813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Recursive walks toward prerequisites look edges up by (graph_id, to_topic_id)
+    op.create_index(
+        'ix_topic_connections_graph_id_to_topic_id', 'topic_connections', ['graph_id', 'to_topic_id']
+    )
+    op.drop_index('ix_topic_connections_graph_id', table_name='topic_connections')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_topic_connections_graph_id', 'topic_connections', ['graph_id'])
+    op.drop_index('ix_topic_connections_graph_id_to_topic_id', table_name='topic_connections')
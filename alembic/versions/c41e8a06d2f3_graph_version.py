@@ -0,0 +1,31 @@
+"""graph version
+
+Revision ID: c41e8a06d2f3
+Revises: 5b0f2c7d91ae
+Create Date: 2026-10-17 13:05:48.117204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8a06d2f3'
+down_revision: Union[str, None] = '5b0f2c7d91ae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'knowledge_graphs',
+        sa.Column('version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('knowledge_graphs', 'version')
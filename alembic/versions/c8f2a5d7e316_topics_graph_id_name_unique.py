@@ -0,0 +1,119 @@
+"""topics graph_id name unique
+
+Revision ID: c8f2a5d7e316
+Revises: b1c7e4a9d502
+Create Date: 2026-10-17 16:41:09.374512
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f2a5d7e316'
+down_revision: Union[str, None] = 'b1c7e4a9d502'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _reseed_closure(conn, graph_id) -> None:
+    """Rewrites one graph's topic_closure by BFS from each of its topics, as a6d2e9f4b813 seeds it."""
+    children = defaultdict(list)
+    for src, dst in conn.execute(
+        sa.text("SELECT from_topic_id, to_topic_id FROM topic_connections WHERE graph_id = :g"), {"g": graph_id}
+    ):
+        children[src].append(dst)
+    rows = []
+    for (topic_id,) in conn.execute(sa.text("SELECT id FROM topics WHERE graph_id = :g"), {"g": graph_id}):
+        depths = {topic_id: 0}
+        frontier = [topic_id]
+        while frontier:
+            reached = []
+            for node in frontier:
+                for nxt in children.get(node, ()):
+                    if nxt not in depths:
+                        depths[nxt] = depths[node] + 1
+                        reached.append(nxt)
+            frontier = reached
+        rows.extend(
+            {'g': graph_id, 'a': topic_id, 'd': d, 'depth': depth} for d, depth in depths.items()
+        )
+    if rows:
+        conn.execute(
+            sa.text(
+                "INSERT INTO topic_closure (graph_id, ancestor_id, descendant_id, depth) "
+                "VALUES (:g, :a, :d, :depth)"
+            ),
+            rows,
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Merge topics named alike within a graph into the one with the lowest id (ids are
+    # random, so an arbitrary pick) and repoint whatever referred to the others
+    op.execute(
+        "CREATE TEMPORARY TABLE topic_merge AS "
+        "SELECT t.id AS old_id, k.id AS new_id, t.graph_id "
+        "FROM topics AS t JOIN ("
+        "  SELECT DISTINCT ON (graph_id, name) id, graph_id, name FROM topics ORDER BY graph_id, name, id"
+        ") AS k ON k.graph_id = t.graph_id AND k.name = t.name "
+        "WHERE t.id <> k.id"
+    )
+    conn = op.get_bind()
+    merged_graphs = conn.execute(sa.text("SELECT DISTINCT graph_id FROM topic_merge")).scalars().all()
+
+    # Edges: drop those that would turn into duplicates or self-loops, then repoint the rest
+    op.execute(
+        "DELETE FROM topic_connections AS c USING ("
+        "  SELECT e.id,"
+        "    row_number() OVER ("
+        "      PARTITION BY coalesce(f.new_id, e.from_topic_id), coalesce(t.new_id, e.to_topic_id) ORDER BY e.id"
+        "    ) AS n,"
+        "    coalesce(f.new_id, e.from_topic_id) = coalesce(t.new_id, e.to_topic_id) AS self_loop"
+        "  FROM topic_connections AS e"
+        "  LEFT JOIN topic_merge AS f ON f.old_id = e.from_topic_id"
+        "  LEFT JOIN topic_merge AS t ON t.old_id = e.to_topic_id"
+        ") AS d "
+        "WHERE d.id = c.id AND (d.n > 1 OR d.self_loop)"
+    )
+    op.execute(
+        "UPDATE topic_connections SET "
+        "from_topic_id = coalesce((SELECT new_id FROM topic_merge WHERE old_id = from_topic_id), from_topic_id), "
+        "to_topic_id = coalesce((SELECT new_id FROM topic_merge WHERE old_id = to_topic_id), to_topic_id) "
+        "WHERE from_topic_id IN (SELECT old_id FROM topic_merge) OR to_topic_id IN (SELECT old_id FROM topic_merge)"
+    )
+
+    # Knowledge: keep each (user, merged topic)'s highest status, then repoint
+    op.execute(
+        "DELETE FROM user_knowledge AS u USING ("
+        "  SELECT k.id, row_number() OVER ("
+        "    PARTITION BY k.user_id, coalesce(m.new_id, k.topic_id) ORDER BY k.status DESC, k.id"
+        "  ) AS n"
+        "  FROM user_knowledge AS k LEFT JOIN topic_merge AS m ON m.old_id = k.topic_id"
+        ") AS d "
+        "WHERE d.id = u.id AND d.n > 1"
+    )
+    op.execute(
+        "UPDATE user_knowledge SET topic_id = m.new_id FROM topic_merge AS m "
+        "WHERE user_knowledge.topic_id = m.old_id"
+    )
+
+    # Closure: merging topics can shorten paths, so recompute the affected graphs
+    op.execute("DELETE FROM topic_closure WHERE graph_id IN (SELECT graph_id FROM topic_merge)")
+    op.execute("DELETE FROM topics WHERE id IN (SELECT old_id FROM topic_merge)")
+    for graph_id in merged_graphs:
+        _reseed_closure(conn, graph_id)
+    op.execute("DROP TABLE topic_merge")
+
+    op.drop_index('ix_topics_graph_id_name', table_name='topics')
+    op.create_index('uq_topics_graph_id_name', 'topics', ['graph_id', 'name'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_topics_graph_id_name', table_name='topics')
+    op.create_index('ix_topics_graph_id_name', 'topics', ['graph_id', 'name'])
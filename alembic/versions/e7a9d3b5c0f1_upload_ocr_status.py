@@ -0,0 +1,34 @@
+"""upload ocr status
+
+Revision ID: e7a9d3b5c0f1
+Revises: c41e8a06d2f3
+Create Date: 2026-10-17 13:31:02.658914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a9d3b5c0f1'
+down_revision: Union[str, None] = 'c41e8a06d2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'uploads',
+        sa.Column('ocr_status', sa.String(length=20), server_default='pending', nullable=False)
+    )
+    # Uploads exist before any graph is built from them
+    op.alter_column('uploads', 'graph_id', existing_type=sa.UUID(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('uploads', 'graph_id', existing_type=sa.UUID(), nullable=False)
+    op.drop_column('uploads', 'ocr_status')
@@ -0,0 +1,40 @@
+"""user knowledge unique
+
+Revision ID: f3b8c1d6a294
+Revises: e7a9d3b5c0f1
+Create Date: 2026-10-17 14:05:47.219630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8c1d6a294'
+down_revision: Union[str, None] = 'e7a9d3b5c0f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep each (user, topic)'s highest-status row; on ties the lowest id, an arbitrary
+    # pick since ids are random uuids and the table has no timestamp
+    op.execute(
+        "DELETE FROM user_knowledge AS a USING user_knowledge AS b "
+        "WHERE a.user_id = b.user_id AND a.topic_id = b.topic_id "
+        "AND (a.status < b.status OR (a.status = b.status AND a.id > b.id))"
+    )
+    op.drop_index('ix_user_knowledge_user_id_topic_id', table_name='user_knowledge')
+    op.create_index(
+        'uq_user_knowledge_user_id_topic_id', 'user_knowledge',
+        ['user_id', 'topic_id'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_user_knowledge_user_id_topic_id', table_name='user_knowledge')
+    op.create_index('ix_user_knowledge_user_id_topic_id', 'user_knowledge', ['user_id', 'topic_id'])
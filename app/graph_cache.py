@@ -0,0 +1,115 @@
+# app/graph_cache.py
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Optional, Sequence, Tuple
+
+
+class CompiledGraph:
+    """
+    Read-only adjacency for one graph in CSR form.
+
+    Nodes are renumbered 0..n-1; the out-neighbours of node i are
+    targets[offsets[i]:offsets[i + 1]]. Names are interned so repeated
+    topic names across graphs share storage.
+    """
+    __slots__ = ("ids", "names", "name_index", "offsets", "targets", "nbytes")
+
+    def __init__(self, nodes: Iterable[Tuple[object, str]], edges: Iterable[Tuple[object, object]]):
+        self.ids: List[object] = []
+        self.names: List[str] = []
+        id_index = {}
+        self.name_index = {}
+        for node_id, name in nodes:
+            idx = len(self.ids)
+            id_index[node_id] = idx
+            self.ids.append(node_id)
+            name = sys.intern(name)
+            self.names.append(name)
+            self.name_index.setdefault(name, idx)
+
+        pairs = [
+            (id_index[src], id_index[dst])
+            for src, dst in edges
+            if src in id_index and dst in id_index
+        ]
+        counts = [0] * (len(self.ids) + 1)
+        for src, _ in pairs:
+            counts[src + 1] += 1
+        for i in range(len(self.ids)):
+            counts[i + 1] += counts[i]
+        self.offsets = array("l", counts)
+        self.targets = array("l", bytes(self.offsets.itemsize * len(pairs)))
+        cursor = list(counts[:-1])
+        for src, dst in pairs:
+            self.targets[cursor[src]] = dst
+            cursor[src] += 1
+
+        self.nbytes = (
+            self.offsets.itemsize * len(self.offsets)
+            + self.targets.itemsize * len(self.targets)
+            + sys.getsizeof(self.ids) + sys.getsizeof(self.names) + sys.getsizeof(self.name_index)
+            + sum(sys.getsizeof(n) for n in self.names)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get(self, node: int, default: Sequence[int] = ()) -> Sequence[int]:
+        """Out-neighbours of node; dict-style so it can stand in for an adjacency dict."""
+        if not 0 <= node < len(self.ids):
+            return default
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def index_of(self, name: str) -> Optional[int]:
+        return self.name_index.get(name)
+
+
+class GraphCache:
+    """Process-level LRU of CompiledGraph objects, bounded by an approximate memory budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CompiledGraph]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CompiledGraph]:
+        with self._lock:
+            graph = self._entries.get(key)
+            if graph is not None:
+                self._entries.move_to_end(key)
+            return graph
+
+    def put(self, key: Hashable, graph: CompiledGraph) -> None:
+        if graph.nbytes > self.max_bytes:
+            return  # never worth evicting everything else for one graph
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = graph
+            self._bytes += graph.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Keyed by graph id (UUID). Every write to a graph's topics or edges in the shared database
+# invalidates its entry (import_topics, backend create_graph and delete_graph): src/crud.py
+# writes its own SQLite store, which roadmap queries never read, so create_topic_hierarchy
+# has nothing to invalidate.
+graph_cache = GraphCache(int(os.getenv("ROADMAP_CACHE_BYTES", str(64 * 1024 * 1024))))
@@ -1,14 +1,22 @@
 # app/roadmap.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Optional, Dict
-from collections import defaultdict
+from typing import Iterable, Iterator, List, Optional, Dict, Set, Tuple
+from collections import defaultdict, deque
+from uuid import UUID, uuid4
+import heapq
+import itertools
 
+from sqlalchemy import insert, literal, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from sqlalchemy.future import select
 
 from backend.database import SessionLocal
-from backend.models import Topic, TopicConnection
+from backend.models import KnowledgeGraph, Topic, TopicClosure, TopicConnection
+from app.graph_cache import CompiledGraph, graph_cache
 
 router = APIRouter()
 
@@ -25,6 +33,8 @@ class ConnectionCreate(BaseModel):
 class LLMResponse(BaseModel):
     topics: List[TopicCreate]
     connections: List[ConnectionCreate]
+    # Topics are unique per graph (Topic.graph_id is NOT NULL), so imports always name one
+    graph_id: UUID
 
 
 ### Dependency to get a DB session ###
@@ -33,93 +43,409 @@ async def get_db() -> AsyncSession:
         yield session
 
 
+def _insert(db: AsyncSession, model):
+    """INSERT construct for the session's dialect so ON CONFLICT works on Postgres and SQLite."""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(model)
+    return pg_insert(model)
+
+
+def _bfs(adjacency: Dict[UUID, List[UUID]], sources: Iterable[UUID]) -> Dict[UUID, int]:
+    """Fewest edges from the nearest of sources to every node they reach, sources included."""
+    depths = dict.fromkeys(sources, 0)
+    frontier = list(depths)
+    while frontier:
+        reached = []
+        for node in frontier:
+            for nxt in adjacency.get(node, ()):
+                if nxt not in depths:
+                    depths[nxt] = depths[node] + 1
+                    reached.append(nxt)
+        frontier = reached
+    return depths
+
+
+async def _close_edges(db: AsyncSession, graph_id: UUID, new_edges: Set[Tuple[UUID, UUID]]):
+    """
+    Extends topic_closure after new_edges were inserted into graph_id. Only topics that
+    reach a new edge's tail gain paths, so only those are re-walked by BFS over the
+    graph's edges and upserted in one executemany.
+    """
+    stmt = (
+        select(TopicConnection.from_topic_id, TopicConnection.to_topic_id)
+        .where(TopicConnection.graph_id == graph_id)
+    )
+    children: Dict[UUID, List[UUID]] = defaultdict(list)
+    parents: Dict[UUID, List[UUID]] = defaultdict(list)
+    for src, dst in (await db.execute(stmt)).all():
+        children[src].append(dst)
+        parents[dst].append(src)
+
+    rows = [
+        {"graph_id": graph_id, "ancestor_id": ancestor, "descendant_id": descendant, "depth": depth}
+        for ancestor in _bfs(parents, [src for src, _ in new_edges])
+        for descendant, depth in _bfs(children, [ancestor]).items()
+        if depth
+    ]
+    if rows:
+        closure = TopicClosure.__table__
+        upsert = _insert(db, closure)
+        await db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[closure.c.ancestor_id, closure.c.descendant_id],
+                set_={"depth": upsert.excluded.depth},   # depths only ever shrink
+            ),
+            rows,
+        )
+
+
 @router.post("/topics/import", summary="Import topics + connections from LLM output")
 async def import_topics(
     payload: LLMResponse,
     db: AsyncSession = Depends(get_db),
 ):
-    # 1) Upsert all topics, keep a map name→Topic
-    topic_map: Dict[str, Topic] = {}
+    # Same name twice in one payload → first description wins
+    topics: Dict[str, TopicCreate] = {}
     for t in payload.topics:
-        q = await db.execute(select(Topic).where(Topic.name == t.name))
-        topic = q.scalar_one_or_none()
-        if not topic:
-            topic = Topic(name=t.name, description=t.description)
-            db.add(topic)
-            await db.flush()      # so .id is populated
-        topic_map[t.name] = topic
-
-    await db.commit()
-
-    # 2) Create TopicConnection edges
-    for c in payload.connections:
-        src = topic_map.get(c.from_topic)
-        dst = topic_map.get(c.to_topic)
-        if not src or not dst:
-            continue  # skip if a topic was missing
-        # check for existing edge
-        q = await db.execute(
-            select(TopicConnection)
-            .where(TopicConnection.from_topic_id == src.id)
-            .where(TopicConnection.to_topic_id == dst.id)
-        )
-        if not q.scalar_one_or_none():
-            edge = TopicConnection(
-                from_topic_id=src.id,
-                to_topic_id=dst.id
+        topics.setdefault(t.name, t)
+
+    def named(names):
+        return select(Topic.name, Topic.id).where(Topic.graph_id == payload.graph_id, Topic.name.in_(names))
+
+    topic_ids: Dict[str, UUID] = {}
+
+    # Constant number of statements, all in one transaction
+    async with db.begin():
+        # 1) Resolve every name in one IN (...) query
+        if topics:
+            q = await db.execute(named(list(topics)))
+            topic_ids.update(q.all())
+
+        # 2) Insert the missing topics with one multi-row INSERT
+        missing = [t for name, t in topics.items() if name not in topic_ids]
+        inserted_topics = 0
+        if missing:
+            q = await db.execute(
+                _insert(db, Topic)
+                .values([
+                    {"id": uuid4(), "graph_id": payload.graph_id, "name": t.name, "description": t.description}
+                    for t in missing
+                ])
+                .on_conflict_do_nothing(index_elements=[Topic.graph_id, Topic.name])
+                .returning(Topic.name, Topic.id)
+            )
+            rows = q.all()
+            inserted_topics = len(rows)
+            topic_ids.update(rows)
+            if rows:
+                await db.execute(
+                    _insert(db, TopicClosure)
+                    .values([
+                        {"graph_id": payload.graph_id, "ancestor_id": topic_id, "descendant_id": topic_id, "depth": 0}
+                        for _, topic_id in rows
+                    ])
+                    .on_conflict_do_nothing()
+                )
+
+            # Rows dropped by ON CONFLICT on uq_topics_graph_id_name were created
+            # concurrently in the same graph; pick them up
+            lost = [t.name for t in missing if t.name not in topic_ids]
+            if lost:
+                q = await db.execute(named(lost))
+                topic_ids.update(q.all())
+
+        # 3) Load the existing edges between the affected pairs in one query
+        pairs = {
+            (topic_ids[c.from_topic], topic_ids[c.to_topic])
+            for c in payload.connections
+            if c.from_topic in topic_ids and c.to_topic in topic_ids
+        }
+        existing = set()
+        if pairs:
+            q = await db.execute(
+                select(TopicConnection.from_topic_id, TopicConnection.to_topic_id)
+                .where(tuple_(TopicConnection.from_topic_id, TopicConnection.to_topic_id).in_(list(pairs)))
             )
-            db.add(edge)
+            existing = {tuple(row) for row in q.all()}
+
+        # 4) Insert the new edges in one batch
+        new_edges = pairs - existing
+        if new_edges:
+            await db.execute(
+                insert(TopicConnection),
+                [
+                    {"id": uuid4(), "graph_id": payload.graph_id, "from_topic_id": src, "to_topic_id": dst}
+                    for src, dst in new_edges
+                ],
+            )
+            # Keep the reachability index in step, in one batch
+            await _close_edges(db, payload.graph_id, new_edges)
+
+        # 5) Bump the graph's version if it gained a topic or edge
+        if inserted_topics or new_edges:
+            await db.execute(
+                update(KnowledgeGraph)
+                .where(KnowledgeGraph.id == payload.graph_id)
+                .values(version=KnowledgeGraph.version + 1)
+            )
+
+    graph_cache.invalidate(payload.graph_id)
 
-    await db.commit()
-    return {"imported_topics": len(topic_map), "imported_connections": len(payload.connections)}
+    return {
+        "imported_topics": len(topic_ids),
+        "imported_connections": len(payload.connections),
+        "inserted_topics": inserted_topics,
+        "skipped_topics": len(payload.topics) - inserted_topics,
+        "inserted_connections": len(new_edges),
+        "skipped_connections": len(payload.connections) - len(new_edges),
+    }
+
+
+### Compiled graph loading ###
+async def load_compiled_graph(db: AsyncSession, graph_id: UUID) -> CompiledGraph:
+    """Return the CSR adjacency for graph_id, compiling it on a cache miss."""
+    graph = graph_cache.get(graph_id)
+    if graph is not None:
+        return graph
+
+    topics = (await db.execute(select(Topic.id, Topic.name).where(Topic.graph_id == graph_id))).all()
+    conns = (await db.execute(
+        select(TopicConnection.from_topic_id, TopicConnection.to_topic_id)
+        .where(TopicConnection.graph_id == graph_id)
+    )).all()
+
+    graph = CompiledGraph(topics, conns)
+    graph_cache.put(graph_id, graph)
+    return graph
+
+
+### Subgraph loading ###
+def _walk_cte(graph_id: UUID, root_id: UUID, forward: bool, max_depth: Optional[int], name: str):
+    """
+    WITH RECURSIVE CTE of topic_id: topics of graph_id reachable from root_id, following
+    edges forward (toward dependents) or backward. Without max_depth, UNION keeps each
+    topic once, so the walk is complete at any length and still ends on cycles; with
+    it, rows carry their depth and stop max_depth edges out.
+    """
+    src, dst = TopicConnection.from_topic_id, TopicConnection.to_topic_id
+    if not forward:
+        src, dst = dst, src
+    if max_depth is None:
+        walk = select(Topic.id.label("topic_id")).where(Topic.id == root_id).cte(name, recursive=True)
+        return walk.union(
+            select(dst)
+            .select_from(TopicConnection)
+            .join(walk, src == walk.c.topic_id)
+            .where(TopicConnection.graph_id == graph_id)
+        )
+    walk = (
+        select(Topic.id.label("topic_id"), literal(0).label("depth"))
+        .where(Topic.id == root_id)
+        .cte(name, recursive=True)
+    )
+    return walk.union(
+        select(dst, walk.c.depth + 1)
+        .select_from(TopicConnection)
+        .join(walk, src == walk.c.topic_id)
+        .where(TopicConnection.graph_id == graph_id, walk.c.depth < max_depth)
+    )
+
+
+async def _resolve_graph(db: AsyncSession, start: str, target: str) -> Tuple[UUID, UUID, UUID]:
+    """(graph_id, start_id, target_id) of the most recently updated graph holding both topics."""
+    s, t = aliased(Topic), aliased(Topic)
+    q = await db.execute(
+        select(s.graph_id, s.id, t.id)
+        .join(t, t.graph_id == s.graph_id)
+        .join(KnowledgeGraph, KnowledgeGraph.id == s.graph_id)
+        .where(s.name == start, t.name == target)
+        .order_by(KnowledgeGraph.updated_at.desc())
+        .limit(1)
+    )
+    row = q.first()
+    if row is not None:
+        return tuple(row)
+    found = await db.execute(select(Topic.id).where(Topic.name == start).limit(1))
+    if found.first() is None:
+        raise HTTPException(404, f"Start topic '{start}' not found")
+    raise HTTPException(404, f"Target topic '{target}' not found")
+
+
+async def load_subgraph(
+    db: AsyncSession, graph_id: UUID, start_id: UUID, target_id: UUID, max_depth: Optional[int]
+) -> CompiledGraph:
+    """
+    Only the part of graph_id that lies on some start→target path: topics reachable
+    from start that also reach target. Two statements, whatever the database size.
+    """
+    fwd = _walk_cte(graph_id, start_id, True, max_depth, "fwd")
+    bwd = _walk_cte(graph_id, target_id, False, max_depth, "bwd")
+    topics = (await db.execute(
+        select(Topic.id, Topic.name)
+        .where(Topic.id.in_(select(fwd.c.topic_id)), Topic.id.in_(select(bwd.c.topic_id)))
+    )).all()
+    # An edge is on a path iff its tail is reachable from start and its head reaches target
+    conns = (await db.execute(
+        select(TopicConnection.from_topic_id, TopicConnection.to_topic_id)
+        .where(
+            TopicConnection.graph_id == graph_id,
+            TopicConnection.from_topic_id.in_(select(fwd.c.topic_id)),
+            TopicConnection.to_topic_id.in_(select(bwd.c.topic_id)),
+        )
+    )).all()
+    return CompiledGraph(topics, conns)
+
+
+### Path search helpers ###
+def _shortest_path(
+    adj: CompiledGraph,
+    source: int,
+    target: int,
+    banned_nodes: Set[int],
+    banned_edges: Set[Tuple[int, int]],
+    max_depth: Optional[int] = None,
+) -> Optional[List[int]]:
+    """Iterative BFS for the fewest-hop path, or None if unreachable within max_depth edges."""
+    if source == target:
+        return [source]
+    parent = {source: None}
+    frontier = deque([(source, 0)])
+    while frontier:
+        node_id, depth = frontier.popleft()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for nbr in adj.get(node_id, ()):
+            if nbr in parent or nbr in banned_nodes or (node_id, nbr) in banned_edges:
+                continue
+            parent[nbr] = node_id
+            if nbr == target:
+                path = [nbr]
+                while parent[path[-1]] is not None:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path
+            frontier.append((nbr, depth + 1))
+    return None
+
+
+def k_shortest_paths(
+    adj: CompiledGraph,
+    source: int,
+    target: int,
+    max_depth: Optional[int] = None,
+) -> Iterator[List[int]]:
+    """
+    Yen's algorithm over an unweighted graph: lazily yields simple paths from
+    source to target in order of increasing hop count, so callers only pay for
+    the paths they actually consume.
+    """
+    first = _shortest_path(adj, source, target, set(), set(), max_depth)
+    if first is None:
+        return
+    found = [first]
+    seen = {tuple(first)}
+    candidates: List[Tuple[int, int, List[int]]] = []
+    tie = itertools.count()
+    yield first
+
+    while True:
+        last = found[-1]
+        for i in range(len(last) - 1):
+            root = last[:i + 1]
+            banned_edges = {
+                (p[i], p[i + 1]) for p in found
+                if len(p) > i + 1 and p[:i + 1] == root
+            }
+            budget = None if max_depth is None else max_depth - i
+            spur = _shortest_path(adj, root[-1], target, set(root[:-1]), banned_edges, budget)
+            if spur is None:
+                continue
+            path = root[:-1] + spur
+            key = tuple(path)
+            if key not in seen:
+                seen.add(key)
+                heapq.heappush(candidates, (len(path), next(tie), path))
+        if not candidates:
+            return
+        _, _, path = heapq.heappop(candidates)
+        found.append(path)
+        yield path
 
 
 @router.get("/roadmap", summary="List all prerequisite paths from start→target")
 async def get_roadmap(
     start: str,
     target: str,
+    mode: str = Query("all", pattern="^(all|ranked)$"),
+    k: int = Query(10, ge=1, le=1000),
+    max_depth: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    graph_id: Optional[UUID] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    # 1) Load start/target topics
-    q = await db.execute(select(Topic).where(Topic.name == start))
-    start_topic = q.scalar_one_or_none()
-    if not start_topic:
+    """
+    mode=all returns every simple path (legacy behaviour).
+    mode=ranked returns up to k shortest paths, at most max_depth edges long,
+    paginated with offset/limit; only offset+limit+1 paths are ever computed.
+    graph_id scopes the search to one graph, compiled and cached whole. Without it
+    the graph is taken from the start topic (the most recently updated graph holding
+    both topics) and only the start→target subgraph is loaded, via recursive CTEs.
+    """
+    # 1) Compiled adjacency: the cached graph, or just the relevant subgraph
+    if graph_id is not None:
+        graph = await load_compiled_graph(db, graph_id)
+    else:
+        scope, start_id, target_id = await _resolve_graph(db, start, target)
+        graph = await load_subgraph(db, scope, start_id, target_id, max_depth)
+
+    start_idx = graph.index_of(start)
+    target_idx = graph.index_of(target)
+    if graph_id is None and (start_idx is None or target_idx is None):
+        # _resolve_graph found both topics; the subgraph leaves them out when no path joins them
+        if mode == "ranked":
+            return {"paths": [], "offset": offset, "limit": limit, "next_offset": None}
+        return {"paths": []}
+
+    if start_idx is None:
         raise HTTPException(404, f"Start topic '{start}' not found")
 
-    q = await db.execute(select(Topic).where(Topic.name == target))
-    target_topic = q.scalar_one_or_none()
-    if not target_topic:
+    if target_idx is None:
         raise HTTPException(404, f"Target topic '{target}' not found")
 
-    # 2) Preload all Topic.id→name
-    q = await db.execute(select(Topic.id, Topic.name))
-    rows = q.all()  # list of (id, name)
-    id_to_name = {rid: name for rid, name in rows}
-
-    # 3) Build adjacency list from from_topic_id → list of to_topic_id
-    q = await db.execute(select(TopicConnection.from_topic_id, TopicConnection.to_topic_id))
-    conns = q.all()
-    adj: Dict[str, List[str]] = defaultdict(list)
-    for src_id, dst_id in conns:
-        adj[src_id].append(dst_id)
+    if mode == "ranked":
+        # One path past the page, to tell whether another page exists
+        stop = min(k, offset + limit + 1)
+        ranked = itertools.islice(
+            k_shortest_paths(graph, start_idx, target_idx, max_depth), stop
+        )
+        page = list(itertools.islice(ranked, offset, None))
+        has_more = len(page) > limit
+        page = page[:limit]
+        return {
+            "paths": [[graph.names[nid] for nid in path] for path in page],
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if has_more else None,
+        }
 
-    # 4) DFS to collect all paths from start_topic.id → target_topic.id
+    # 2) DFS to collect all paths from start → target
     all_paths: List[List[int]] = []
-    def dfs(node_id: str, path: List[str]):
+    def dfs(node_id: int, path: List[int]):
         path.append(node_id)
-        if node_id == target_topic.id:
+        if node_id == target_idx:
             all_paths.append(path.copy())
         else:
-            for nbr in adj.get(node_id, []):
+            for nbr in graph.get(node_id):
                 if nbr not in path:        # avoid cycles
                     dfs(nbr, path)
         path.pop()
 
-    dfs(start_topic.id, [])
+    dfs(start_idx, [])
 
-    # 5) Convert ID paths → name paths
+    # 3) Convert index paths → name paths
     name_paths = [
-        [id_to_name[nid] for nid in path]
+        [graph.names[nid] for nid in path]
         for path in all_paths
     ]
 
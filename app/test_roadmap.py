@@ -0,0 +1,82 @@
+"""
+get_roadmap against a scratch SQLite database.
+
+Run from the repo root:  python -m pytest app/test_roadmap.py
+"""
+import asyncio
+import uuid
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.graph_cache import graph_cache
+from app.roadmap import LLMResponse, get_db, get_roadmap, import_topics, router
+from backend.database import Base
+from backend.models import KnowledgeGraph
+
+
+def roadmap(tmp_path, graph: dict, start: str, target: str, scoped: bool, mode: str = "all",
+            max_depth=None) -> dict:
+    """Imports graph into a fresh database and returns its start→target roadmap."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'roadmap.db'}")
+    graph_id = uuid.uuid4()
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as db:
+            db.add(KnowledgeGraph(id=graph_id, user_id=uuid.uuid4(), name="test"))
+            await db.commit()
+        async with AsyncSession(engine) as db:
+            await import_topics(LLMResponse(graph_id=graph_id, **graph), db)
+        async with AsyncSession(engine) as db:
+            return await get_roadmap(
+                start=start, target=target, mode=mode, k=10, max_depth=max_depth,
+                offset=0, limit=10, graph_id=graph_id if scoped else None, db=db,
+            )
+
+    try:
+        return asyncio.run(run())
+    finally:
+        asyncio.run(engine.dispose())
+        graph_cache.clear()
+
+
+GRAPH = {
+    "topics": [{"name": "A"}, {"name": "B"}, {"name": "C"}],
+    "connections": [{"from_topic": "A", "to_topic": "B"}],
+}
+
+
+@pytest.mark.parametrize("scoped", [True, False], ids=["scoped", "unscoped"])
+def test_connected_pair(tmp_path, scoped):
+    assert roadmap(tmp_path, GRAPH, start="A", target="B", scoped=scoped) == {"paths": [["A", "B"]]}
+
+
+@pytest.mark.parametrize("scoped", [True, False], ids=["scoped", "unscoped"])
+@pytest.mark.parametrize("mode", ["all", "ranked"])
+def test_unconnected_pair_has_no_paths(tmp_path, scoped, mode):
+    result = roadmap(tmp_path, GRAPH, start="A", target="C", scoped=scoped, mode=mode)
+    assert result["paths"] == []
+
+
+def test_path_beyond_max_depth_has_no_paths(tmp_path):
+    chain = {
+        "topics": [{"name": n} for n in "ABCD"],
+        "connections": [{"from_topic": a, "to_topic": b} for a, b in ["AB", "BC", "CD"]],
+    }
+    result = roadmap(tmp_path, chain, start="A", target="D", scoped=False, mode="ranked", max_depth=2)
+    assert result["paths"] == [] and result["next_offset"] is None
+
+
+def test_import_without_graph_id_is_rejected():
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: None  # never reached
+    response = TestClient(app).post("/topics/import", json={"topics": [{"name": "A"}], "connections": []})
+    assert response.status_code == 422
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import UUID
+from uuid import UUID, uuid4
+import os
 
 from backend.database import SessionLocal
-from backend.models import User, KnowledgeGraph, Topic, TopicConnection, UserKnowledge, Upload
+from backend.models import User, KnowledgeGraph, Topic, TopicConnection, TopicClosure, UserKnowledge, Upload
 from backend.auth import authenticate_user, create_access_token, get_current_user, hash_password
-from backend.ocr import run_ocr
+from backend import ocr_jobs
 from backend.llm import extract_concepts, generate_quiz, refine_graph
+from app.graph_cache import graph_cache
 
 # Dependency to get DB session
 async def get_db() -> AsyncSession:
@@ -16,7 +20,8 @@ async def get_db() -> AsyncSession:
 
 # Routers
 auth_router = APIRouter(prefix="/auth", tags=["auth"])
-upload_router = APIRouter(prefix="/upload", tags=["upload"])
+# Starts the OCR pool on resumed uploads and cancels it on shutdown
+upload_router = APIRouter(prefix="/upload", tags=["upload"], lifespan=ocr_jobs.lifespan)
 graph_router = APIRouter(prefix="/graphs", tags=["graphs"])
 
 # 5.1 Auth
@@ -42,22 +47,34 @@ async def me(current_user: User = Depends(get_current_user)):
     return {"id": current_user.id, "username": current_user.username, "email": current_user.email}
 
 # 5.2 File Upload & OCR
-@upload_router.post("/", status_code=status.HTTP_201_CREATED)
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+async def _spool(file: UploadFile, path: str):
+    # File I/O runs in the threadpool so large uploads never block the event loop
+    f = await run_in_threadpool(open, path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await run_in_threadpool(f.write, chunk)
+    finally:
+        await run_in_threadpool(f.close)
+
+@upload_router.post("/", status_code=status.HTTP_202_ACCEPTED)
 async def upload_file(file: UploadFile = File(...), current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    path = f"uploads/{file.filename}"
-    with open(path, "wb") as f:
-        f.write(await file.read())
-    text = await run_ocr(path)
-    upload = Upload(graph_id=None, file_path=path, ocr_text=text)
+    upload_id = uuid4()
+    path = f"uploads/{upload_id}_{os.path.basename(file.filename)}"
+    await _spool(file, path)
+    upload = Upload(id=upload_id, graph_id=None, file_path=path)
     db.add(upload); await db.commit(); await db.refresh(upload)
-    return {"id": upload.id, "file_path": upload.file_path, "ocr_text": upload.ocr_text, "uploaded_at": upload.uploaded_at}
+    # OCR fills in ocr_text later; clients poll GET /upload/{id} for ocr_status
+    await ocr_jobs.submit(upload.id)
+    return {"id": upload.id, "file_path": upload.file_path, "ocr_status": upload.ocr_status, "uploaded_at": upload.uploaded_at}
 
 @upload_router.get("/{upload_id}")
 async def get_upload(upload_id: UUID, current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     upload = await db.get(Upload, upload_id)
     if not upload:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
-    return {"id": upload.id, "file_path": upload.file_path, "ocr_text": upload.ocr_text, "uploaded_at": upload.uploaded_at}
+    return {"id": upload.id, "file_path": upload.file_path, "ocr_status": upload.ocr_status, "ocr_text": upload.ocr_text, "uploaded_at": upload.uploaded_at}
 
 # 5.3 Graph Management
 @graph_router.post("/", status_code=status.HTTP_201_CREATED)
@@ -71,9 +88,14 @@ async def create_graph(upload_id: UUID, name: str, current: User = Depends(get_c
     db.add(graph); await db.commit(); await db.refresh(graph)
     # create Topic and Connection based on concepts
     for t in concepts['topics']:
-        topic = Topic(graph_id=graph.id, name=t['name'], description=t.get('description'))
+        topic = Topic(id=uuid4(), graph_id=graph.id, name=t['name'], description=t.get('description'))
         db.add(topic)
+        # Every topic reaches itself; edge inserts extend the closure from these rows
+        db.add(TopicClosure(graph_id=graph.id, ancestor_id=topic.id, descendant_id=topic.id, depth=0))
+    graph.version += 1
     await db.commit()
+    # A roadmap request between the two commits may have compiled the graph without its topics
+    graph_cache.invalidate(graph.id)
     # ... similarly create TopicConnection
     return {"id": graph.id, "name": graph.name, "created_at": graph.created_at, "updated_at": graph.updated_at}
 
@@ -83,17 +105,43 @@ async def list_graphs(current: User = Depends(get_current_user), db: AsyncSessio
     graphs = result.scalars().all()
     return [{"id": g.id, "name": g.name, "created_at": g.created_at, "updated_at": g.updated_at} for g in graphs]
 
-@graph_router.get("/{graph_id}")
-async def get_graph(graph_id: UUID, current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def _owned_graph(graph_id: UUID, current: User, db: AsyncSession) -> KnowledgeGraph:
     graph = await db.get(KnowledgeGraph, graph_id)
     if not graph or graph.user_id != current.id:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
-    nodes = [{"id": t.id, "name": t.name, "description": t.description} for t in graph.topics]
-    edges = []
-    for t in graph.topics:
-        for conn in t.outgoing:
-            edges.append({"id": conn.id, "from": conn.from_topic_id, "to": conn.to_topic_id})
-    return {"nodes": nodes, "edges": edges}
+    return graph
+
+# Flat column queries: one statement each however large the graph, and no lazy loads under AsyncSession
+async def _graph_nodes(graph_id: UUID, db: AsyncSession) -> list:
+    result = await db.execute(
+        select(Topic.id, Topic.name, Topic.description).where(Topic.graph_id == graph_id)
+    )
+    return [{"id": r.id, "name": r.name, "description": r.description} for r in result]
+
+async def _graph_edges(graph_id: UUID, db: AsyncSession) -> list:
+    result = await db.execute(
+        select(TopicConnection.id, TopicConnection.from_topic_id, TopicConnection.to_topic_id)
+        .where(TopicConnection.graph_id == graph_id)
+    )
+    return [{"id": r.id, "from": r.from_topic_id, "to": r.to_topic_id} for r in result]
+
+def graph_etag(graph: KnowledgeGraph) -> str:
+    return f'"{graph.id}:{graph.version}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+@graph_router.get("/{graph_id}")
+async def get_graph(graph_id: UUID, request: Request, response: Response, current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    graph = await _owned_graph(graph_id, current, db)
+    etag = graph_etag(graph)
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"nodes": await _graph_nodes(graph.id, db), "edges": await _graph_edges(graph.id, db)}
 
 @graph_router.delete("/{graph_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_graph(graph_id: UUID, current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
@@ -101,31 +149,32 @@ async def delete_graph(graph_id: UUID, current: User = Depends(get_current_user)
     if not graph or graph.user_id != current.id:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
     await db.delete(graph); await db.commit()
+    graph_cache.invalidate(graph_id)
 
 # 5.4 Node & Connection
 @graph_router.get("/{graph_id}/nodes/")
 async def list_nodes(graph_id: UUID, current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    return (await get_graph(graph_id, current, db))["nodes"]
+    graph = await _owned_graph(graph_id, current, db)
+    return await _graph_nodes(graph.id, db)
 
 @graph_router.get("/{graph_id}/nodes/{node_id}")
 async def node_detail(graph_id: UUID, node_id: UUID, current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     topic = await db.get(Topic, node_id)
     if not topic or topic.graph_id != graph_id:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
-    prereq = [ {"id": c.from_topic.id, "name": c.from_topic.name} for c in topic.incoming ]
+    result = await db.execute(
+        select(Topic.id, Topic.name)
+        .join(TopicConnection, TopicConnection.from_topic_id == Topic.id)
+        .where(TopicConnection.to_topic_id == topic.id)
+    )
+    prereq = [{"id": r.id, "name": r.name} for r in result]
     summary = topic.description  # or call LLM summary
     return {"id": topic.id, "name": topic.name, "description": topic.description, "prerequisites": prereq, "summary": summary}
 
 @graph_router.get("/{graph_id}/edges/")
 async def list_edges(graph_id: UUID, current: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    graph = await db.get(KnowledgeGraph, graph_id)
-    if not graph or graph.user_id != current.id:
-        raise HTTPException(status.HTTP_404_NOT_FOUND)
-    edges = []
-    for t in graph.topics:
-        for conn in t.outgoing:
-            edges.append({"id": conn.id, "from": conn.from_topic_id, "to": conn.to_topic_id})
-    return edges
+    graph = await _owned_graph(graph_id, current, db)
+    return await _graph_edges(graph.id, db)
 
 # 5.5 Assessment & Refinement
 @graph_router.post("/{graph_id}/assess")
@@ -1,8 +1,8 @@
-from database import Base
+from backend.database import Base
 
 from sqlalchemy import (
     Column, String, Text, ForeignKey, DateTime, Enum as SQLEnum, Integer, CheckConstraint,
-    func
+    Index, func
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -32,6 +32,8 @@ class KnowledgeGraph(Base):
     name = Column(String(100), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    # Bumped on every topic/edge write; served as the graph's ETag
+    version = Column(Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     owner = relationship('User', back_populates='graphs')
@@ -41,6 +43,10 @@ class KnowledgeGraph(Base):
 
 class Topic(Base):
     __tablename__ = 'topics'
+    __table_args__ = (
+        # One topic per name in a graph; import_topics' ON CONFLICT relies on it
+        Index('uq_topics_graph_id_name', 'graph_id', 'name', unique=True),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     graph_id = Column(UUID(as_uuid=True), ForeignKey('knowledge_graphs.id'), nullable=False)
     name = Column(String(100), nullable=False)
@@ -61,7 +67,13 @@ class Topic(Base):
 
 class TopicConnection(Base):
     __tablename__ = 'topic_connections'
+    __table_args__ = (
+        # Also serves graph_id-only reads; to_topic_id makes prerequisite-ward walks indexed
+        Index('ix_topic_connections_graph_id_to_topic_id', 'graph_id', 'to_topic_id'),
+        Index('uq_topic_connections_from_to', 'from_topic_id', 'to_topic_id', unique=True),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    graph_id = Column(UUID(as_uuid=True), ForeignKey('knowledge_graphs.id'), nullable=False)
     from_topic_id = Column(UUID(as_uuid=True), ForeignKey('topics.id'), nullable=False)
     to_topic_id = Column(UUID(as_uuid=True), ForeignKey('topics.id'), nullable=False)
 
@@ -70,8 +82,26 @@ class TopicConnection(Base):
     to_topic = relationship('Topic', foreign_keys=[to_topic_id], back_populates='incoming')
 
 
+# Reachability index: (prerequisite, dependent) pairs joined by a path, shortest length as depth;
+# every topic also reaches itself at depth 0
+class TopicClosure(Base):
+    __tablename__ = 'topic_closure'
+    __table_args__ = (
+        Index('ix_topic_closure_descendant_id_ancestor_id', 'descendant_id', 'ancestor_id'),
+        Index('ix_topic_closure_graph_id', 'graph_id'),
+    )
+    # Derived rows: the database drops them with their graph or topics
+    graph_id = Column(UUID(as_uuid=True), ForeignKey('knowledge_graphs.id', ondelete='CASCADE'), nullable=False)
+    ancestor_id = Column(UUID(as_uuid=True), ForeignKey('topics.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = Column(UUID(as_uuid=True), ForeignKey('topics.id', ondelete='CASCADE'), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+
 class UserKnowledge(Base):
     __tablename__ = 'user_knowledge'
+    __table_args__ = (
+        Index('uq_user_knowledge_user_id_topic_id', 'user_id', 'topic_id', unique=True),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
     topic_id = Column(UUID(as_uuid=True), ForeignKey('topics.id'), nullable=False)
@@ -92,8 +122,11 @@ class Upload(Base):
     title = Column(String(100), nullable=False)
     description = Column(Text)
     tag = Column(String(50))
-    graph_id = Column(UUID(as_uuid=True), ForeignKey('knowledge_graphs.id'), nullable=False)
+    graph_id = Column(UUID(as_uuid=True), ForeignKey('knowledge_graphs.id'), nullable=True)
     file_path = Column(String(255), nullable=False)
+    ocr_text = Column(Text)
+    # pending -> processing -> done | failed, filled in by the background OCR pool
+    ocr_status = Column(String(20), nullable=False, default='pending', server_default='pending')
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     # Relationships
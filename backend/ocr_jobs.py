@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from uuid import UUID
+
+from sqlalchemy import select, update
+
+from backend.database import SessionLocal
+from backend.models import Upload
+from backend.ocr import run_ocr
+
+# OCR jobs running at once, and jobs allowed to wait before submit() applies backpressure
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "100"))
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+_workers = []
+
+
+async def submit(upload_id: UUID):
+    """Queues an upload for OCR, starting the worker pool on first use."""
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=OCR_QUEUE_SIZE)
+        _workers.extend(asyncio.create_task(_worker()) for _ in range(OCR_WORKERS))
+    await _queue.put(upload_id)
+
+
+async def resume():
+    """
+    Re-queues the uploads a previous process accepted but never finished: the queue
+    lives in memory, so a restart loses it. Assumes one process runs the pool.
+    """
+    async with SessionLocal() as db:
+        # Interrupted mid-job; run them again
+        await db.execute(update(Upload).where(Upload.ocr_status == "processing").values(ocr_status="pending"))
+        await db.commit()
+        result = await db.execute(
+            select(Upload.id).where(Upload.ocr_status == "pending").order_by(Upload.uploaded_at)
+        )
+        upload_ids = result.scalars().all()
+    for upload_id in upload_ids:
+        await submit(upload_id)
+
+
+async def stop():
+    """Cancels the workers. Queued uploads stay pending for resume() on the next start."""
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # In the background: with a full queue, resume() waits on the workers
+    resuming = asyncio.create_task(resume())
+    try:
+        yield
+    finally:
+        resuming.cancel()
+        await asyncio.gather(resuming, return_exceptions=True)
+        await stop()
+
+
+async def _worker():
+    while True:
+        upload_id = await _queue.get()
+        try:
+            await _process(upload_id)
+        except Exception:
+            logger.exception("OCR failed for upload %s", upload_id)
+            await _mark_failed(upload_id)
+        finally:
+            _queue.task_done()
+
+
+async def _process(upload_id: UUID):
+    async with SessionLocal() as db:
+        # Claim the upload, so one queued twice (by submit and resume) is processed once
+        result = await db.execute(
+            update(Upload)
+            .where(Upload.id == upload_id, Upload.ocr_status == "pending")
+            .values(ocr_status="processing")
+            .returning(Upload.file_path)
+        )
+        file_path = result.scalar()
+        await db.commit()
+        if file_path is None:
+            return
+        text = await run_ocr(file_path)
+        await db.execute(update(Upload).where(Upload.id == upload_id).values(ocr_text=text, ocr_status="done"))
+        await db.commit()
+
+
+async def _mark_failed(upload_id: UUID):
+    try:
+        async with SessionLocal() as db:
+            await db.execute(
+                update(Upload)
+                .where(Upload.id == upload_id, Upload.ocr_status.in_(("pending", "processing")))
+                .values(ocr_status="failed")
+            )
+            await db.commit()
+    except Exception:
+        # Leaves the row for resume() to retry; the worker itself must keep running
+        logger.exception("Could not mark upload %s as failed", upload_id)
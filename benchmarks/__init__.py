@@ -0,0 +1,16 @@
+"""
+Micro-benchmarks for the graph CRUD and roadmap paths, run against SQLite with
+pytest-benchmark. From the repo root:
+
+    python -m pytest benchmarks                             # 10^2 and 10^4 nodes
+    python -m pytest benchmarks --sizes 100,10000,1000000
+    python -m pytest benchmarks -k roadmap
+    python -m pytest benchmarks --benchmark-save=baseline   # after an intended change
+
+Every case gets an untimed warm-up call before its timed rounds. A plain run is
+compared with the latest run checked in under benchmarks/baselines/<machine>/
+and fails when any case's median is more than 50% slower (see conftest.py);
+runs that save, or pass their own --benchmark-compare, are not gated. Baselines
+are machine-specific: record them on the machine that runs the comparison, with
+the default --fan-in/--depth/--seed. Dependencies are in requirements-dev.txt.
+"""
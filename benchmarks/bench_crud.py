@@ -0,0 +1,13 @@
+"""src/crud.py cases."""
+import uuid
+
+
+def bench_create_topic_hierarchy(timed, src, dag):
+    hierarchy = dag.hierarchy()
+    timed(lambda: src.crud.create_topic_hierarchy(src.write_engine, str(uuid.uuid4()), hierarchy))
+
+
+def bench_get_graph_by_id(timed, src, dag):
+    graph_id = str(uuid.uuid4())
+    src.crud.create_topic_hierarchy(src.write_engine, graph_id, dag.hierarchy())
+    timed(lambda: src.crud.get_graph_by_id(src.read_engine, graph_id))
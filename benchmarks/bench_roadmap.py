@@ -0,0 +1,47 @@
+"""app/roadmap.py cases, on SQLite through aiosqlite."""
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.graph_cache import graph_cache
+from app.roadmap import LLMResponse, get_roadmap, import_topics
+from backend.models import KnowledgeGraph
+
+
+def bench_import_topics(timed, app_engine, loop, dag):
+    engine = app_engine()
+
+    async def one_round():
+        async with AsyncSession(engine) as db:
+            await import_topics(LLMResponse(**dag.llm_response(uuid.uuid4())), db)
+
+    timed(lambda: loop.run_until_complete(one_round()))
+
+
+@pytest.mark.parametrize("scoped", [True, False], ids=["cached", "cte"])
+def bench_get_roadmap(timed, app_engine, loop, dag, scoped):
+    """
+    cached: graph_id given, so rounds reuse the graph the warm-up call compiled.
+    cte: no graph_id; every round resolves the graph and loads the subgraph with recursive CTEs.
+    """
+    engine = app_engine()
+    graph_id = uuid.uuid4()
+
+    async def load():
+        async with AsyncSession(engine) as db:
+            db.add(KnowledgeGraph(id=graph_id, user_id=uuid.uuid4(), name="benchmark"))
+            await db.commit()
+        async with AsyncSession(engine) as db:
+            await import_topics(LLMResponse(**dag.llm_response(graph_id)), db)
+    loop.run_until_complete(load())
+    graph_cache.clear()
+
+    async def one_round():
+        async with AsyncSession(engine) as db:
+            await get_roadmap(
+                start=dag.leaf, target=dag.root, mode="ranked", k=10, max_depth=None,
+                offset=0, limit=10, graph_id=graph_id if scoped else None, db=db,
+            )
+
+    timed(lambda: loop.run_until_complete(one_round()))
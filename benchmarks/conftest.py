@@ -0,0 +1,147 @@
+"""
+Fixtures shared by the benchmark cases: the synthetic DAGs, the src/ engines,
+scratch app/ databases and timed(), which runs a case under pytest-benchmark.
+"""
+import asyncio
+import math
+import os
+import sys
+import time
+import types
+import uuid
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.utils import get_machine_id, parse_compare_fail
+
+from benchmarks.dag import SyntheticDAG
+
+ROOT = Path(__file__).resolve().parent.parent
+# pytest-benchmark storage; recorded runs land in a per-machine subdirectory
+BASELINES = Path(__file__).resolve().parent / "baselines"
+# Slowdown against the latest recorded run that fails a plain run
+COMPARE_FAIL = "median:50%"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks", "synthetic DAG")
+    group.addoption("--sizes", default="100,10000",
+                    help="comma-separated node counts; 1000000 is supported but slow (default: %(default)s)")
+    group.addoption("--fan-in", type=int, default=2)
+    group.addoption("--depth", type=int, default=8)
+    group.addoption("--seed", type=int, default=0)
+
+
+def pytest_configure(config):
+    option = config.option
+    # Keep runs next to the cases wherever pytest is started from, unless a storage is given
+    if getattr(option, "benchmark_storage", None) != "file://./.benchmarks":
+        return
+    option.benchmark_storage = f"file://{BASELINES}"
+
+    # Fail on regressions against the latest checked-in run, unless this run compares
+    # against something else or records a new baseline
+    if option.benchmark_compare or option.benchmark_save or option.benchmark_autosave or option.benchmark_disable:
+        return
+    if not any((BASELINES / get_machine_id()).glob("[0-9][0-9][0-9][0-9]_*.json")):
+        config.issue_config_time_warning(
+            pytest.PytestWarning(f"no baseline recorded for {get_machine_id()}; not checking for regressions"),
+            stacklevel=2,
+        )
+        return
+    option.benchmark_compare = True
+    option.benchmark_compare_fail = option.benchmark_compare_fail or [parse_compare_fail(COMPARE_FAIL)]
+
+
+def pytest_generate_tests(metafunc):
+    if "dag" in metafunc.fixturenames:
+        sizes = [int(s) for s in metafunc.config.getoption("sizes").split(",")]
+        metafunc.parametrize("dag", sizes, indirect=True, ids=str, scope="session")
+
+
+@pytest.fixture(scope="session")
+def dag(request) -> SyntheticDAG:
+    config = request.config
+    return SyntheticDAG(
+        request.param, config.getoption("fan_in"), config.getoption("depth"), config.getoption("seed")
+    )
+
+
+@pytest.fixture(scope="session")
+def workdir(tmp_path_factory) -> Path:
+    return tmp_path_factory.mktemp("benchmarks")
+
+
+@pytest.fixture(scope="session")
+def src(workdir):
+    """crud and the src/ engines, on a scratch database instead of src/test.db."""
+    # db.py reads SQLITE_URL when first imported, so set it before anything imports crud
+    os.environ["SQLITE_URL"] = f"sqlite:///{workdir / 'src.db'}"
+    sys.path.insert(0, str(ROOT / "src"))
+    import crud
+    import db
+    return types.SimpleNamespace(crud=crud, write_engine=db.write_engine, read_engine=db.read_engine)
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def app_engine(workdir, loop):
+    """Factory for fresh SQLite databases with the backend schema, for the app/ cases."""
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from backend.database import Base
+    import backend.models  # noqa: F401  registers the tables
+
+    engines = []
+
+    async def create(engine):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    def make():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{workdir / uuid.uuid4().hex}.db")
+        loop.run_until_complete(create(engine))
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        loop.run_until_complete(engine.dispose())
+
+
+@pytest.fixture
+def timed(benchmark, request):
+    """
+    timed(fn) calls fn once untimed, so caches are warm (the compiled graph for
+    get_roadmap[cached], SQLite's page cache, canonical topics), then times it with
+    benchmark.pedantic: enough rounds to fill --benchmark-max-time, never fewer than
+    --benchmark-min-rounds, so fast cases get a stable median and slow ones stay
+    affordable.
+    """
+    config = request.config
+    min_rounds = int(config.getoption("benchmark_min_rounds"))
+    max_time = float(config.getoption("benchmark_max_time"))
+    benchmark.extra_info.update(
+        fan_in=config.getoption("fan_in"), depth=config.getoption("depth"), seed=config.getoption("seed")
+    )
+
+    def clock(fn) -> float:
+        started = time.perf_counter()
+        fn()
+        return time.perf_counter() - started
+
+    def run(fn):
+        elapsed = clock(fn)  # warm-up
+        if elapsed < max_time:
+            # The warm-up paid the one-off costs; size the run from a warm call
+            elapsed = clock(fn)
+        rounds = max(min_rounds, math.ceil(max_time / max(elapsed, 1e-9)))
+        return benchmark.pedantic(fn, rounds=rounds, iterations=1)
+
+    return run
@@ -0,0 +1,70 @@
+import random
+import string
+from typing import Dict, List, Tuple
+
+
+def topic_names(count: int, rng: random.Random) -> List[str]:
+    """Distinct random two-word names, far enough apart that canonicalization never merges them."""
+    names, seen = [], set()
+    while len(names) < count:
+        name = " ".join(
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 9))).title()
+            for _ in range(2)
+        )
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+class SyntheticDAG:
+    """
+    Layered prerequisite DAG. Layer 0 is the single root topic; each of the
+    `depth` layers below it holds an equal share of the remaining nodes, and
+    every topic there is a prerequisite of `fan_in` topics in the layer above,
+    so topics above the bottom layer have `fan_in` prerequisites on average.
+    The same seed always yields the same graph.
+    """
+
+    def __init__(self, nodes: int, fan_in: int = 2, depth: int = 8, seed: int = 0):
+        rng = random.Random(seed)
+        self.names = topic_names(nodes, rng)
+        depth = max(1, min(depth, nodes - 1))
+        width = -(-(nodes - 1) // depth)  # ceil
+
+        self.layers: List[List[int]] = [[0]]
+        for start in range(1, nodes, width):
+            self.layers.append(list(range(start, min(start + width, nodes))))
+
+        # (prerequisite, dependent) index pairs
+        self.edges: List[Tuple[int, int]] = []
+        for above, layer in zip(self.layers, self.layers[1:]):
+            for node in layer:
+                for dependent in rng.sample(above, min(fan_in, len(above))):
+                    self.edges.append((node, dependent))
+
+    @property
+    def root(self) -> str:
+        return self.names[0]
+
+    @property
+    def leaf(self) -> str:
+        return self.names[self.layers[-1][0]]
+
+    def hierarchy(self) -> Dict[str, str]:
+        """create_topic_hierarchy input: each topic's first dependent, the root mapped to "ROOT"."""
+        hierarchy = {}
+        for src, dst in self.edges:
+            hierarchy.setdefault(self.names[src], self.names[dst])
+        hierarchy[self.root] = "ROOT"
+        return hierarchy
+
+    def llm_response(self, graph_id=None) -> dict:
+        """import_topics payload carrying every edge."""
+        return {
+            "graph_id": graph_id,
+            "topics": [{"name": name} for name in self.names],
+            "connections": [
+                {"from_topic": self.names[src], "to_topic": self.names[dst]} for src, dst in self.edges
+            ],
+        }
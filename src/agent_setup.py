@@ -1,8 +1,9 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from llama_stack_client import Agent, AgentEventLogger, RAGDocument, LlamaStackClient
 from llama_stack_client.types import Model
+from concurrent.futures import ThreadPoolExecutor
 import threading
 
 # --- Constants ---
@@ -20,6 +21,9 @@ llm_model = None
 embedding_model = None
 agent = None
 session_id = None
+llm_ready = False
+# Serialises the one-time setup between the startup thread and the first request
+setup_lock = threading.Lock()
 
 # --- Setup Functions ---
 def initialize_models():
@@ -28,6 +32,9 @@ def initialize_models():
     llm_model = next(m for m in models if m.model_type == "llm")
     embedding_model = next(m for m in models if m.model_type == "embedding")
 
+def vector_db_exists() -> bool:
+    return any(db.identifier == VECTOR_DB_ID for db in client.vector_dbs.list())
+
 def setup_vector_db():
     client.vector_dbs.register(
         vector_db_id=VECTOR_DB_ID,
@@ -67,14 +74,49 @@ def create_session():
     global session_id
     session_id = agent.create_session(SESSION_NAME)
 
+def setup_llama_stack():
+    """Loads the models; registers and ingests into the vector DB only if the server doesn't have it yet."""
+    global llm_ready
+    with setup_lock:
+        if llm_ready:
+            return
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            models = pool.submit(initialize_models)
+            exists = pool.submit(vector_db_exists)
+            models.result()
+            if not exists.result():
+                setup_vector_db()
+                ingest_document()
+        llm_ready = True
+
+def ensure_agent():
+    """Creates the agent and its session on first use, retrying setup if boot-time setup failed."""
+    if session_id is not None:
+        return
+    setup_llama_stack()
+    with setup_lock:
+        if session_id is None:
+            create_agent()
+            create_session()
+
 # --- Run Setup on Startup ---
 @app.on_event("startup")
 def startup():
-    initialize_models()
-    setup_vector_db()
-    ingest_document()
-    create_agent()
-    create_session()
+    # Warm up in the background so the server accepts connections right away
+    threading.Thread(target=setup_llama_stack, daemon=True).start()
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz(response: Response):
+    """Readiness: models are loaded and the vector DB exists."""
+    if not llm_ready:
+        response.status_code = 503
+        return {"status": "starting"}
+    return {"status": "ok"}
 
 # --- Request Schema ---
 class ChatRequest(BaseModel):
@@ -84,6 +126,7 @@ class ChatRequest(BaseModel):
 # --- /chat Streaming Endpoint ---
 @app.post("/chat")
 def chat(request: ChatRequest):
+    ensure_agent()
     response = agent.create_turn(
         messages=[{"role": "user", "content": request.prompt}],
         session_id=session_id,
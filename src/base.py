@@ -1,82 +1,111 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, File, Header, HTTPException, Query, Request, Response, UploadFile
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from llama_stack_client import Agent, AgentEventLogger, RAGDocument, LlamaStackClient
+from fastapi.concurrency import run_in_threadpool
+from llama_stack_client import AsyncLlamaStackClient, RAGDocument
+from llama_stack_client.lib.agents.agent import AsyncAgent
+from llama_stack_client.lib.agents.event_logger import TurnStreamEventPrinter
 from llama_stack_client.types import Model
 from crud import *
+from sessions import SessionPool
+from stream_json import PairStreamParser
+from pdf_extract import discard_spool, iter_page_texts, shutdown_executor, spool_upload
+from ingest import start_ingestion
+from retrieval_cache import retrieval_cache
+from llama_stack_client.lib.agents.client_tool import client_tool
+from contextlib import aclosing
+import asyncio
+import hashlib
+import hmac
 import json
+import logging
+import os
+import uuid
 
 import sqlalchemy as sa
 from crud import *
-from tables import engine, conn
+from db import read_engine, write_engine
 from models import *
-import pdfplumber
-import io
-
-engine = sa.create_engine("sqlite:///./test.db", connect_args={"check_same_thread": False})
 
 user_id = "bruhbruhrbruh"
 
-def extract_text_from_pdf(bytes_data: bytes) -> str:
-    text = ""
-    with pdfplumber.open(io.BytesIO(bytes_data)) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-            text += "\n"
-    return text
-
-
 # --- Constants ---
 BASE_URL = "http://localhost:8321"
 VECTOR_DB_ID = "my_demo_vector_db"
 DOC_URL = "https://www.paulgraham.com/greatwork.html"
 SESSION_NAME = "rag_session_pg"
+# Max agent turns in flight at once, independent of the HTTP worker pool
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+# Live agent sessions kept per pool, and seconds before an idle one is recycled
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "256"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+# Seconds a cached decomposition stays valid, and how many entries are kept
+DECOMP_CACHE_TTL = float(os.getenv("DECOMP_CACHE_TTL", str(7 * 24 * 3600)))
+DECOMP_CACHE_MAX_ENTRIES = int(os.getenv("DECOMP_CACHE_MAX_ENTRIES", "10000"))
+# Chunks knowledge_search returns per query
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+# Default number of topics a /decomp/batch request decomposes at once
+DECOMP_BATCH_PARALLELISM = int(os.getenv("DECOMP_BATCH_PARALLELISM", "4"))
+# Shared secret for the /admin endpoints, sent as X-Admin-Token; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 # --- Global Setup ---
+logger = logging.getLogger(__name__)
 app = FastAPI()
-client = LlamaStackClient(base_url=BASE_URL)
+# Fire-and-forget tasks, referenced here so the loop cannot collect them mid-run
+app.state.background_tasks = set()
+client = AsyncLlamaStackClient(base_url=BASE_URL)
+llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+# Serialises the one-time llama stack setup and agent creation
+setup_lock = asyncio.Lock()
 
 # One-time model and DB setup
 llm_model = None
 embedding_model = None
 tutor_agent, decomp_agent = None, None
-tutor_session_id, decomp_session_id = None, None
+tutor_sessions, decomp_sessions = None, None
+llm_ready = False
+startup_task = None
+
+async def require_admin(x_admin_token: str = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="invalid admin token")
 
 # --- Setup Functions ---
-def initialize_models():
+async def initialize_models():
     global llm_model, embedding_model
-    models = client.models.list()
+    models = await client.models.list()
     llm_model = next(m for m in models if m.model_type == "llm")
     embedding_model = next(m for m in models if m.model_type == "embedding")
 
-def setup_vector_db():
-    client.vector_dbs.register(
+async def vector_db_exists() -> bool:
+    return any(db.identifier == VECTOR_DB_ID for db in await client.vector_dbs.list())
+
+async def setup_vector_db():
+    await client.vector_dbs.register(
         vector_db_id=VECTOR_DB_ID,
         embedding_model=embedding_model.identifier,
         embedding_dimension=embedding_model.metadata["embedding_dimension"],
         provider_id="faiss",
     )
 
-def ingest_document():
+async def ingest_document():
     document = RAGDocument(
         document_id="document_pg",
         content=DOC_URL,
         mime_type="text/html",
         metadata={},
     )
-    client.tool_runtime.rag_tool.insert(
+    await client.tool_runtime.rag_tool.insert(
         documents=[document],
         vector_db_id=VECTOR_DB_ID,
         chunk_size_in_tokens=50,
     )
 
-def create_agents():
-    global tutor_agent, decomp_agent
-
-    decomp_agent = Agent(
-        client,
-        model=llm_model.identifier,
-        instructions="""You are a foundational topic decomposition engine.
+DECOMP_INSTRUCTIONS = """You are a foundational topic decomposition engine.
 
         Given a complex topic, break it down into a hierarchy of prerequisite subtopics that must be understood in order to fully grasp the final topic.
 
@@ -118,16 +147,47 @@ def create_agents():
         ### Now do the same for:
 
         Main Topic: {{YOUR_TOPIC_HERE}}
-        """,
-        tools=[
-            {
-                "name": "builtin::rag/knowledge_search",
-                "args": {"vector_db_ids": [VECTOR_DB_ID]},
-            }
-        ],
+        """
+# Part of the decomposition cache key, so editing the prompt retires old entries
+DECOMP_TEMPLATE_HASH = hashlib.sha256(DECOMP_INSTRUCTIONS.encode("utf-8")).hexdigest()
+
+def content_text(content) -> str:
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    return "\n".join(getattr(item, "text", "") for item in content)
+
+@client_tool
+async def knowledge_search(query: str) -> str:
+    """Search the knowledge base for passages relevant to a query.
+
+    :param query: what to look up, e.g. a topic name or a question about it
+    :returns: the retrieved passages
+    """
+    # Runs client-side instead of builtin::rag/knowledge_search so repeated
+    # queries skip the embedding and vector search round trips
+    async def fetch():
+        result = await client.tool_runtime.rag_tool.query(
+            content=query,
+            vector_db_ids=[VECTOR_DB_ID],
+            query_config={"max_chunks": RETRIEVAL_TOP_K},
+        )
+        return content_text(result.content)
+
+    return await retrieval_cache.get(VECTOR_DB_ID, query, RETRIEVAL_TOP_K, fetch)
+
+def create_agents():
+    global tutor_agent, decomp_agent
+
+    decomp_agent = AsyncAgent(
+        client,
+        model=llm_model.identifier,
+        instructions=DECOMP_INSTRUCTIONS,
+        tools=[knowledge_search],
     )
 
-    tutor_agent = Agent(
+    tutor_agent = AsyncAgent(
         client,
         model=llm_model.identifier,
         instructions="""YYou are an expert tutor engine designed to teach complex topics to learners in a clear, structured, and approachable way.
@@ -175,107 +235,294 @@ def create_agents():
 
         <TOPIC>: {{YOUR_TOPIC_HERE}}
         """,
-        tools=[
-            {
-                "name": "builtin::rag/knowledge_search",
-                "args": {"vector_db_ids": [VECTOR_DB_ID]},
-            }
-        ],
+        tools=[knowledge_search],
     )
 
 def create_sessions():
-    global tutor_session_id, decomp_session_id
-    tutor_session_id = tutor_agent.create_session(SESSION_NAME)
-    decomp_session_id = decomp_agent.create_session(SESSION_NAME)
+    global tutor_sessions, decomp_sessions
+    tutor_sessions = SessionPool(tutor_agent, SESSION_NAME, SESSION_POOL_SIZE, SESSION_TTL)
+    decomp_sessions = SessionPool(decomp_agent, SESSION_NAME, SESSION_POOL_SIZE, SESSION_TTL)
+
+async def setup_llama_stack():
+    """Loads the models and registers the vector DB unless the server already has it."""
+    global llm_ready
+    async with setup_lock:
+        if llm_ready:
+            return
+        _, exists = await asyncio.gather(initialize_models(), vector_db_exists())
+        if not exists:
+            await setup_vector_db()
+        llm_ready = True
+
+async def ensure_agents():
+    """Creates the agents and their session pools on first use, retrying setup if boot-time setup failed."""
+    if tutor_agent is not None:
+        return
+    await setup_llama_stack()
+    async with setup_lock:
+        if tutor_agent is None:
+            create_agents()
+            create_sessions()
 
 # --- Run Setup on Startup ---
+def run_in_background(coro, name: str) -> asyncio.Task:
+    """Starts coro as a task held in app.state.background_tasks until it ends; failures are logged."""
+    task = asyncio.ensure_future(coro)
+    task.set_name(name)
+    app.state.background_tasks.add(task)
+    task.add_done_callback(_background_task_done)
+    return task
+
+def _background_task_done(task: asyncio.Task):
+    app.state.background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task %r failed", task.get_name(), exc_info=task.exception())
+
 @app.on_event("startup")
-def startup():
-    initialize_models()
-    setup_vector_db()
-    #ingest_document()
-    create_agents()
-    create_sessions()
+async def startup():
+    # Warm up in the background so DB-only endpoints serve traffic right away;
+    # ensure_agents retries the setup if this attempt fails
+    global startup_task
+    startup_task = run_in_background(setup_llama_stack(), "llama stack setup")
+    # Index topics written before the canonical and closure tables existed; no-ops once done
+    run_in_background(run_in_threadpool(backfill_topic_canonical, write_engine), "topic canonical backfill")
+    run_in_background(run_in_threadpool(backfill_topic_closure, write_engine), "topic closure backfill")
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz(response: Response):
+    """Readiness: the database answers. llm says whether agent endpoints will respond without waiting on setup."""
+    try:
+        with read_engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+    except sa.exc.SQLAlchemyError:
+        response.status_code = 503
+        return {"status": "unavailable", "db": False, "llm": llm_ready}
+    return {"status": "ok", "db": True, "llm": llm_ready}
 
 # --- Request Schema ---
 class ChatRequest(BaseModel):
     user_id: str
     prompt: str
 
+async def turn_text(agent, session_id: str, prompt: str):
+    """
+    Runs one agent turn and yields its printable pieces as they arrive, minus the
+    inference headers. Holds an LLM slot until the turn is fully consumed.
+    """
+    async with llm_slots:
+        response = await agent.create_turn(
+            messages=[{"role": "user", "content": prompt}],
+            session_id=session_id,
+            stream=True,
+        )
+        printer = TurnStreamEventPrinter()
+        async with aclosing(response):
+            async for chunk in response:
+                for log in printer.yield_printable_events(chunk):
+                    if log.role == "inference":
+                        continue
+                    yield str(log)
+
 # --- /chat Streaming Endpoint ---
 @app.post("/tutorchat")
-def chat(request: ChatRequest):
-    response = tutor_agent.create_turn(
-        messages=[{"role": "user", "content": request.prompt}],
-        session_id=tutor_session_id,
-        stream=True,
-    )
+async def chat(request: ChatRequest, mode: str = Query("stream", pattern="^(stream|buffered)$")):
+    """mode=stream sends tokens as chunked text as they are generated; mode=buffered returns one JSON body."""
+    await ensure_agents()
+
+    async def pieces():
+        # Leased for the whole turn, so the pool cannot recycle the session mid-stream
+        async with tutor_sessions.lease(request.user_id) as session_id:
+            async with aclosing(turn_text(tutor_agent, session_id, request.prompt)) as turn:
+                async for piece in turn:
+                    yield piece
 
-    output = ""
-    for log in AgentEventLogger().log(response):
-        if log.role == "inference":
-            continue
-        #print(vars(log))
-        output += str(log)
+    if mode == "stream":
+        return StreamingResponse(pieces(), media_type="text/plain")
 
+    output = "".join([piece async for piece in pieces()])
     return {"response": output.strip()}
 
-@app.post("/decomp")
-def chat(request: ChatRequest):
+async def decompose(user_id: str, prompt: str) -> dict:
+    """Decomposes one topic into a new graph for user_id and returns the /decomp response body."""
+    await ensure_agents()
     # Create a knowledge graph entry first
-    graph_id = create_graph(
-        engine,
-        user_id=request.user_id,
-        name=f"Graph for {request.prompt}"  # Using the prompt as graph name
+    graph_id = await run_in_threadpool(
+        create_graph,
+        write_engine,
+        user_id=user_id,
+        name=f"Graph for {prompt}"  # Using the prompt as graph name
     )
 
-    response = decomp_agent.create_turn(
-        messages=[{"role": "user", "content": request.prompt}],
-        session_id=decomp_session_id,
-        stream=True,
+    cached = await run_in_threadpool(
+        get_cached_decomposition, write_engine, prompt,
+        llm_model.identifier, DECOMP_TEMPLATE_HASH, DECOMP_CACHE_TTL
     )
-
-    output = ""
-    for log in AgentEventLogger().log(response):
-        if log.role == "inference":
-            continue
-        output += str(log)
-
-    try:
-        parsed = json.loads(output)
-        # Pass the graph_id to create_topic_hierarchy
-        create_topic_hierarchy(engine, graph_id, parsed)
-        print(graph_id)
+    if cached is not None:
+        await run_in_threadpool(create_topic_hierarchy, write_engine, graph_id, cached)
         return {
             "graph_id": graph_id,
-            "data": parsed
+            "data": cached,
+            "cached": True
         }
-    except json.JSONDecodeError:
-        return {"error": "Could not parse response as JSON", "raw": output}
-    
 
-# @app.post("/upload-pdf")
-# async def upload_pdf(file: UploadFile = File(...)):
-#     contents = await file.read()
-#     extracted_text = extract_text_from_pdf(contents)
-#     prompt = f"Summarize this:\n{extracted_text}"
+    # Persist pairs as soon as the stream completes them; stop generating on bad output
+    parser = PairStreamParser()
+    parsed = {}
+    output = []
+    try:
+        # One session per user: graph ids are new on every call, so keying by them never reused one
+        async with decomp_sessions.lease(user_id) as session_id:
+            async with aclosing(turn_text(decomp_agent, session_id, prompt)) as pieces:
+                async for piece in pieces:
+                    output.append(piece)
+                    pairs = parser.feed(piece)
+                    if pairs:
+                        batch = dict(pairs)
+                        parsed.update(batch)
+                        await run_in_threadpool(create_topic_hierarchy, write_engine, graph_id, batch)
+        parser.close()
+    except ValueError:
+        # The pairs stored so far are an arbitrary prefix of a bad answer; drop them
+        await run_in_threadpool(delete_graph, write_engine, graph_id)
+        return {"error": "Could not parse response as JSON", "raw": "".join(output)}
+    except BaseException:
+        # Failed or cancelled turn (e.g. a /decomp/batch client went away): same
+        await run_in_threadpool(delete_graph, write_engine, graph_id)
+        raise
+
+    await run_in_threadpool(
+        store_decomposition, write_engine, prompt, llm_model.identifier,
+        DECOMP_TEMPLATE_HASH, parsed, DECOMP_CACHE_MAX_ENTRIES
+    )
+    return {
+        "graph_id": graph_id,
+        "data": parsed,
+        "cached": False
+    }
+
+@app.post("/decomp")
+async def chat(request: ChatRequest):
+    return await decompose(request.user_id, request.prompt)
 
-#     response = tutor_agent.create_turn(
-#         messages=[{"role": "user", "content": prompt}],
-#         session_id=tutor_session_id,
-#         stream=True,
-#     )
+class BatchDecompRequest(BaseModel):
+    user_id: str
+    prompts: list[str]
+
+@app.post("/decomp/batch")
+async def decomp_batch(request: BatchDecompRequest, parallelism: int = Query(DECOMP_BATCH_PARALLELISM, ge=1)):
+    """
+    Decomposes every prompt concurrently, at most `parallelism` at a time (and never
+    more than LLM_CONCURRENCY turns overall), streaming one NDJSON line per prompt
+    in completion order. Each line carries its prompt and index alongside the
+    usual /decomp body.
+    """
+    slots = asyncio.Semaphore(parallelism)
+
+    async def run(index: int, prompt: str) -> dict:
+        async with slots:
+            try:
+                result = await decompose(request.user_id, prompt)
+            except Exception as e:
+                # One failed topic should not take the rest of the batch with it
+                result = {"error": str(e)}
+        return {"index": index, "prompt": prompt, **result}
+
+    async def stream():
+        tasks = [asyncio.ensure_future(run(i, p)) for i, p in enumerate(request.prompts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done, default=str) + "\n"
+        finally:
+            # Client went away: stop the turns nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.delete("/admin/decomp-cache", dependencies=[Depends(require_admin)])
+def api_purge_decomp_cache(prompt: str = None):
+    """Purges every cached decomposition, or only the entries for one prompt."""
+    return {"purged": purge_decompositions(write_engine, prompt)}
+    
 
-#     def stream():
-#         for log in AgentEventLogger().log(response):
-#             yield str(log).strip()
+@app.post("/upload-pdf")
+async def upload_pdf(file: UploadFile = File(...)):
+    """Streams the upload's text back page by page while later pages are still being extracted."""
+    path = await spool_upload(file)
+
+    async def stream():
+        try:
+            async for text in iter_page_texts(path):
+                yield text + "\n"
+        finally:
+            discard_spool(path)
+
+    # The generator's finally never runs if the body is never started, so the response removes the file too
+    return StreamingResponse(stream(), media_type="text/plain", background=BackgroundTask(discard_spool, path))
+
+# async so the cache is only ever touched from the event loop, never the threadpool
+@app.get("/admin/retrieval-cache", dependencies=[Depends(require_admin)])
+async def api_retrieval_cache_stats():
+    return retrieval_cache.stats()
+
+@app.delete("/admin/retrieval-cache", dependencies=[Depends(require_admin)])
+async def api_clear_retrieval_cache():
+    retrieval_cache.clear()
+    return retrieval_cache.stats()
+
+@app.post("/ingest/upload/{upload_id}", status_code=202)
+async def api_ingest_upload(upload_id: str, response: Response):
+    """Queues an upload's OCR text for RAG ingestion; poll /ingest/{document_id} for progress."""
+    text = await run_in_threadpool(get_upload_text, read_engine, upload_id)
+    if text is None:
+        response.status_code = 404
+        return {"error": "Upload not found or has no OCR text yet"}
+
+    async def load_text():
+        await setup_llama_stack()
+        return text
+
+    document_id = f"upload-{upload_id}"
+    await start_ingestion(client, VECTOR_DB_ID, document_id, f"upload:{upload_id}", load_text)
+    return {"document_id": document_id, "status": "pending"}
+
+@app.post("/ingest/pdf", status_code=202)
+async def api_ingest_pdf(file: UploadFile = File(...)):
+    """Queues a PDF's text for RAG ingestion; extraction runs in the background as well."""
+    path = await spool_upload(file)
+
+    async def load_text():
+        try:
+            await setup_llama_stack()
+            return "\n".join([text async for text in iter_page_texts(path)])
+        finally:
+            os.unlink(path)
+
+    document_id = f"pdf-{uuid.uuid4()}"
+    await start_ingestion(client, VECTOR_DB_ID, document_id, f"pdf:{file.filename}", load_text)
+    return {"document_id": document_id, "status": "pending"}
+
+@app.get("/ingest/{document_id}")
+def api_ingestion_status(document_id: str):
+    status = get_ingestion_status(read_engine, document_id)
+    if status:
+        return status
+    else:
+        return {"error": "No ingestion found for this id"}
 
-#     return StreamingResponse(stream(), media_type="text/plain")
+@app.on_event("shutdown")
+def shutdown():
+    shutdown_executor()
 
 @app.post("/createuser")
 def api_create_user(user: UserCreate):
     user_id = create_user(
-        engine,
+        write_engine,
         username=user.username,
         email=user.email,
         hashed_password=user.password  # Note: In production, you should hash this!
@@ -286,17 +533,85 @@ def api_create_user(user: UserCreate):
 
 @app.get("/getuser")
 def api_get_user(username: str):
-    user = get_user_by_username(engine, username)
+    user = get_user_by_username(read_engine, username)
     if user:
         return {"user_id": user["id"], "username": user["username"], "email": user["email"]}
     else:
         return {"error": "User not found"}
     
+def graph_etag(graph_id: str, version: int) -> str:
+    return f'"{graph_id}:{version}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
 @app.get("/getgraph")
-def api_get_graph(graph_id: str):
-    graphs = get_graph_by_id(engine, graph_id)
-    if graphs:
-        return {"graphs": graphs}
-    else:
+def api_get_graph(graph_id: str, request: Request, response: Response):
+    # Cheap primary-key lookups first, so unchanged graphs are never loaded
+    version = get_graph_version(read_engine, graph_id)
+    if version is None:
         return {"error": "No graphs found for this id"}
+    etag = graph_etag(graph_id, version)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    graphs = get_graph_by_id(read_engine, graph_id)
+    response.headers["ETag"] = graph_etag(graph_id, graphs["version"])
+    return {"graphs": graphs}
+
+@app.post("/knowledge/batch")
+def api_track_knowledge_batch(batch: KnowledgeBatch):
+    """Sets many topic statuses for one user in a single transaction; later items win over earlier ones."""
+    ids = track_user_knowledge_batch(
+        write_engine, batch.user_id, [(item.topic_id, item.status) for item in batch.items]
+    )
+    return {"user_id": batch.user_id, "updated": len(ids)}
+
+@app.get("/frontier")
+def api_get_frontier(user_id: str, graph_id: str):
+    """Topics not yet mastered whose prerequisites all are; see MASTERY_THRESHOLD."""
+    return {"topics": get_frontier(write_engine, user_id, graph_id)}
+
+@app.get("/topics/ancestors")
+def api_topic_ancestors(topic_id: str, max_depth: int = Query(None, ge=1)):
+    """All prerequisites of a topic, direct and transitive."""
+    topics = get_topic_ancestors(read_engine, topic_id, max_depth)
+    return {"topics": topics, "count": len(topics)}
+
+@app.get("/topics/descendants")
+def api_topic_descendants(topic_id: str, max_depth: int = Query(None, ge=1)):
+    """All topics that build on a topic, direct and transitive."""
+    topics = get_topic_descendants(read_engine, topic_id, max_depth)
+    return {"topics": topics, "count": len(topics)}
+
+@app.get("/topics/requires")
+def api_topic_requires(topic_id: str, prerequisite_id: str):
+    """Whether learning topic_id requires prerequisite_id first, and how many steps apart they are."""
+    depth = topic_requires(read_engine, topic_id, prerequisite_id)
+    return {"requires": bool(depth), "depth": depth}
+
+@app.get("/topics/neighborhood")
+def api_topic_neighborhood(
+    topic_id: str,
+    hops: int = Query(1, ge=1, le=MAX_WALK_DEPTH),
+    direction: str = Query("both", pattern="^(up|down|both)$")
+):
+    """The subgraph within `hops` edges of a topic: up = prerequisites, down = dependents."""
+    neighborhood = get_topic_neighborhood(read_engine, topic_id, hops, direction)
+    if neighborhood:
+        return neighborhood
+    else:
+        return {"error": "Topic not found"}
+
+@app.get("/topics/search")
+def api_find_topics(name: str):
+    """Topics across all graphs that are the same canonical topic as name, matched loosely."""
+    return {"topics": find_topics(read_engine, name)}
 
+@app.get("/getgraph/changes")
+def api_get_graph_changes(graph_id: str, since: int = 0):
+    """Nodes and edges written after version `since`; poll again with the returned version."""
+    return get_graph_changes(read_engine, graph_id, since)
@@ -1,11 +1,23 @@
+import hashlib
+import json
+import math
+import os
+import re
 import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
 from sqlalchemy import insert, select, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 import sqlalchemy as sa
 from tables import (
     user_table, knowledge_graph_table, topic_table,
-    topic_connection_table, user_knowledge_table, upload_table
+    topic_connection_table, user_knowledge_table, upload_table,
+    decomposition_cache_table, graph_version_table, graph_change_table,
+    ingested_chunk_table, ingestion_status_table,
+    canonical_topic_table, topic_trigram_table, topic_canonical_table,
+    learning_frontier_table, frontier_state_table, topic_closure_table
 )
 
 # --- User CRUD ---
@@ -41,6 +53,22 @@ def create_graph(engine: Engine, user_id: str, name: str):
     return graph_id
 
 
+def delete_graph(engine: Engine, graph_id: str):
+    """Deletes a graph with its topics, edges and every row derived from them."""
+    topic_ids = select(topic_table.c.id).where(topic_table.c.graph_id == graph_id)
+    with engine.begin() as conn:
+        conn.execute(delete(topic_closure_table).where(topic_closure_table.c.graph_id == graph_id))
+        conn.execute(delete(topic_connection_table).where(topic_connection_table.c.graph_id == graph_id))
+        conn.execute(delete(topic_canonical_table).where(topic_canonical_table.c.topic_id.in_(topic_ids)))
+        conn.execute(delete(user_knowledge_table).where(user_knowledge_table.c.topic_id.in_(topic_ids)))
+        conn.execute(delete(learning_frontier_table).where(learning_frontier_table.c.graph_id == graph_id))
+        conn.execute(delete(frontier_state_table).where(frontier_state_table.c.graph_id == graph_id))
+        conn.execute(delete(graph_change_table).where(graph_change_table.c.graph_id == graph_id))
+        conn.execute(delete(graph_version_table).where(graph_version_table.c.graph_id == graph_id))
+        conn.execute(delete(topic_table).where(topic_table.c.graph_id == graph_id))
+        conn.execute(delete(knowledge_graph_table).where(knowledge_graph_table.c.id == graph_id))
+
+
 def get_graphs_by_user(engine: Engine, user_id: str):
     stmt = select(knowledge_graph_table).where(knowledge_graph_table.c.user_id == user_id)
     with engine.connect() as conn:
@@ -57,6 +85,12 @@ def create_topic(engine: Engine, graph_id: str, name: str, description: str = ""
     )
     with engine.begin() as conn:
         conn.execute(stmt)
+        canonical_id = canonical_topic_ids(conn, [name])[name]
+        conn.execute(insert(topic_canonical_table).values(topic_id=topic_id, canonical_id=canonical_id))
+        conn.execute(insert(topic_closure_table).values(
+            graph_id=graph_id, ancestor_id=topic_id, descendant_id=topic_id, depth=0
+        ))
+        bump_graph_version(conn, graph_id, [("topic", topic_id)])
     return topic_id
 
 
@@ -66,29 +100,52 @@ def get_topics_by_graph(engine: Engine, graph_id: str):
         return [dict(row) for row in conn.execute(stmt).fetchall()]
 
 # --- Topic Connections ---
-def create_topic_connection(engine: Engine, from_topic_id: str, to_topic_id: str):
+def create_topic_connection(engine: Engine, graph_id: str, from_topic_id: str, to_topic_id: str):
     conn_id = str(uuid.uuid4())
     stmt = insert(topic_connection_table).values(
         id=conn_id,
+        graph_id=graph_id,
         from_topic_id=from_topic_id,
         to_topic_id=to_topic_id
     )
     with engine.begin() as conn:
         conn.execute(stmt)
+        close_edges(conn, graph_id, [(from_topic_id, to_topic_id)])
+        bump_graph_version(conn, graph_id, [("edge", conn_id)])
     return conn_id
 
 # --- User Knowledge ---
 def track_user_knowledge(engine: Engine, user_id: str, topic_id: str, status: int = 1):
-    knowledge_id = str(uuid.uuid4())
-    stmt = insert(user_knowledge_table).values(
-        id=knowledge_id,
-        user_id=user_id,
-        topic_id=topic_id,
-        status=status
-    )
+    """Sets user_id's status for one topic. Returns the id of the (possibly existing) row."""
     with engine.begin() as conn:
-        conn.execute(stmt)
-    return knowledge_id
+        return upsert_user_knowledge(conn, user_id, [(topic_id, status)])[topic_id]
+
+
+def upsert_user_knowledge(conn, user_id: str, statuses: list) -> dict:
+    """
+    Sets user_id's status for many (topic_id, status) pairs inside the caller's
+    transaction, one multi-row INSERT ... ON CONFLICT DO UPDATE per 500 pairs,
+    and updates the learning frontier. Returns topic_id -> row id.
+    """
+    latest = dict(statuses)  # a pair repeated in one batch would conflict with itself
+    ids = {}
+    for chunk in _chunked(list(latest.items())):
+        stmt = sqlite_insert(user_knowledge_table).values([
+            {"id": str(uuid.uuid4()), "user_id": user_id, "topic_id": topic_id, "status": status}
+            for topic_id, status in chunk
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[user_knowledge_table.c.user_id, user_knowledge_table.c.topic_id],
+            set_={"status": stmt.excluded.status}
+        ).returning(user_knowledge_table.c.topic_id, user_knowledge_table.c.id)
+        ids.update(conn.execute(stmt).all())
+    update_frontier(conn, user_id, list(latest))
+    return ids
+
+
+def track_user_knowledge_batch(engine: Engine, user_id: str, statuses: list) -> dict:
+    with engine.begin() as conn:
+        return upsert_user_knowledge(conn, user_id, statuses)
 
 
 def get_user_knowledge(engine: Engine, user_id: str):
@@ -96,72 +153,730 @@ def get_user_knowledge(engine: Engine, user_id: str):
     with engine.connect() as conn:
         return [dict(row) for row in conn.execute(stmt).fetchall()]
 
+# --- Learning Frontier ---
+# Status at or above which a topic counts as mastered
+MASTERY_THRESHOLD = int(os.getenv("MASTERY_THRESHOLD", "80"))
+
+
+def _mastered(user_id: str):
+    """Subquery of the topic ids user_id has mastered."""
+    return (
+        select(user_knowledge_table.c.topic_id)
+        .where(user_knowledge_table.c.user_id == user_id)
+        .group_by(user_knowledge_table.c.topic_id)
+        .having(sa.func.max(user_knowledge_table.c.status) >= MASTERY_THRESHOLD)
+    )
+
+
+def _frontier_topics(conn, user_id: str, graph_id: str, topic_ids: list = None) -> list:
+    """Frontier topics of the graph, or only those among topic_ids."""
+    mastered = _mastered(user_id)
+    blocked = (
+        select(topic_connection_table.c.id)
+        .where(
+            topic_connection_table.c.to_topic_id == topic_table.c.id,
+            topic_connection_table.c.from_topic_id.not_in(mastered)
+        )
+    )
+    stmt = select(topic_table.c.id).where(
+        topic_table.c.graph_id == graph_id,
+        topic_table.c.id.not_in(mastered),
+        ~blocked.exists()
+    )
+    if topic_ids is not None:
+        stmt = stmt.where(topic_table.c.id.in_(topic_ids))
+    return list(conn.execute(stmt).scalars())
+
+
+def _frontier_is_current(conn, user_id: str, graph_id: str) -> bool:
+    built = conn.execute(
+        select(frontier_state_table.c.version).where(
+            frontier_state_table.c.user_id == user_id,
+            frontier_state_table.c.graph_id == graph_id
+        )
+    ).scalar()
+    return built is not None and built == _graph_version(conn, graph_id)
+
+
+def _replace_frontier(conn, user_id: str, graph_id: str, affected: list = None):
+    """Recomputes the frontier rows for the affected topics, or for the whole graph."""
+    stmt = delete(learning_frontier_table).where(
+        learning_frontier_table.c.user_id == user_id,
+        learning_frontier_table.c.graph_id == graph_id
+    )
+    if affected is not None:
+        stmt = stmt.where(learning_frontier_table.c.topic_id.in_(affected))
+    conn.execute(stmt)
+    topics = _frontier_topics(conn, user_id, graph_id, affected)
+    if topics:
+        conn.execute(insert(learning_frontier_table), [
+            {"user_id": user_id, "graph_id": graph_id, "topic_id": t} for t in topics
+        ])
+
+
+def update_frontier(conn, user_id: str, topic_ids: list):
+    """
+    Called after user_id's status for topic_ids changed. Only those topics and their
+    direct dependents can enter or leave the frontier, so only they are recomputed.
+    Frontiers not built against the current graph version are left to get_frontier.
+    """
+    rows = conn.execute(
+        select(topic_table.c.id, topic_table.c.graph_id).where(topic_table.c.id.in_(topic_ids))
+    ).all()
+    by_graph = defaultdict(set)
+    for topic_id, graph_id in rows:
+        by_graph[graph_id].add(topic_id)
+
+    for graph_id, changed in by_graph.items():
+        if not _frontier_is_current(conn, user_id, graph_id):
+            continue
+        dependents = conn.execute(
+            select(topic_connection_table.c.to_topic_id)
+            .where(topic_connection_table.c.from_topic_id.in_(changed))
+        ).scalars()
+        _replace_frontier(conn, user_id, graph_id, list(changed.union(dependents)))
+
+
+def get_frontier(engine: Engine, user_id: str, graph_id: str) -> list:
+    """
+    Topics of graph_id that user_id should study next. Seeds the maintained
+    frontier on first use and after graph writes, then it's a primary-key lookup.
+    """
+    with engine.begin() as conn:
+        if not _frontier_is_current(conn, user_id, graph_id):
+            _replace_frontier(conn, user_id, graph_id)
+            stmt = sqlite_insert(frontier_state_table).values(
+                user_id=user_id, graph_id=graph_id, version=_graph_version(conn, graph_id)
+            )
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[frontier_state_table.c.user_id, frontier_state_table.c.graph_id],
+                set_={"version": stmt.excluded.version}
+            ))
+        stmt = (
+            select(topic_table.c.id, topic_table.c.name)
+            .join(learning_frontier_table, learning_frontier_table.c.topic_id == topic_table.c.id)
+            .where(
+                learning_frontier_table.c.user_id == user_id,
+                learning_frontier_table.c.graph_id == graph_id
+            )
+        )
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+# --- Graph Versions ---
+def bump_graph_version(conn, graph_id: str, changes: list) -> int:
+    """
+    Increments graph_id's version inside the caller's transaction and records
+    the (kind, entity_id) pairs it changed. Returns the new version.
+    """
+    stmt = sqlite_insert(graph_version_table).values(graph_id=graph_id, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[graph_version_table.c.graph_id],
+        set_={"version": graph_version_table.c.version + 1}
+    ).returning(graph_version_table.c.version)
+    version = conn.execute(stmt).scalar_one()
+    if changes:
+        conn.execute(insert(graph_change_table), [
+            {"graph_id": graph_id, "version": version, "kind": kind, "entity_id": entity_id}
+            for kind, entity_id in changes
+        ])
+    return version
+
+
+def _graph_version(conn, graph_id: str) -> int:
+    stmt = select(graph_version_table.c.version).where(graph_version_table.c.graph_id == graph_id)
+    return conn.execute(stmt).scalar() or 0
+
+
+def get_graph_version(engine: Engine, graph_id: str):
+    """The graph's version, 0 if nothing was written to it yet, or None if there is no such graph."""
+    with engine.connect() as conn:
+        version = conn.execute(
+            select(graph_version_table.c.version).where(graph_version_table.c.graph_id == graph_id)
+        ).scalar()
+        if version is not None:
+            return version
+        # Topics can be written under an id with no knowledge_graphs row, but they always bump a version
+        exists = conn.execute(
+            select(knowledge_graph_table.c.id).where(knowledge_graph_table.c.id == graph_id)
+        ).first()
+        return 0 if exists else None
+
+
+def get_graph_changes(engine: Engine, graph_id: str, since: int):
+    """
+    Returns the nodes and edges of a graph written after version `since`,
+    plus the current version to pass as `since` next time.
+    """
+    def changed(kind):
+        return select(graph_change_table.c.entity_id).where(
+            graph_change_table.c.graph_id == graph_id,
+            graph_change_table.c.version > since,
+            graph_change_table.c.kind == kind
+        )
+
+    topics_stmt = select(
+        topic_table.c.id,
+        topic_table.c.name,
+        topic_table.c.description,
+        topic_table.c.graph_id
+    ).where(topic_table.c.id.in_(changed("topic")))
+
+    connections_stmt = select(
+        topic_connection_table.c.id,
+        topic_connection_table.c.from_topic_id,
+        topic_connection_table.c.to_topic_id,
+        topic_connection_table.c.graph_id
+    ).where(topic_connection_table.c.id.in_(changed("edge")))
+
+    with engine.connect() as conn:
+        return {
+            "version": _graph_version(conn, graph_id),
+            "nodes": [dict(row._mapping) for row in conn.execute(topics_stmt)],
+            "edges": [dict(row._mapping) for row in conn.execute(connections_stmt)]
+        }
+
+# --- Canonical Topics ---
+# Trigram Jaccard similarity at or above which two topic names count as the same topic
+TOPIC_MATCH_THRESHOLD = float(os.getenv("TOPIC_MATCH_THRESHOLD", "0.8"))
+
+
+def _chunked(items: list, size: int = 500):
+    # Stay under SQLite's bound-parameter limit
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def normalize_topic_name(name: str) -> str:
+    return normalize_prompt(name)
+
+
+def name_trigrams(normalized: str) -> set:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _ordinals(normalized: str) -> set:
+    # "Organic Chemistry I" vs "II", "Python 2" vs "3": one token apart yet different topics
+    return {token for token in normalized.split() if re.fullmatch(r"\d+|[ivx]+", token)}
+
+
+def canonical_topic_ids(conn, names: list, create: bool = True, threshold: float = None) -> dict:
+    """
+    Maps each topic name to a canonical topic id: the exact normalized match if there
+    is one, else the most trigram-similar canonical name scoring at least threshold
+    with the same numerals. Names matching nothing get a new canonical topic, or None
+    when create is False. Distinct normalized names in one call never share an id.
+    """
+    threshold = TOPIC_MATCH_THRESHOLD if threshold is None else threshold
+    normalized = {name: normalize_topic_name(name) for name in names}
+    wanted = list(dict.fromkeys(normalized.values()))
+
+    canonical = {}
+    for chunk in _chunked(wanted):
+        canonical.update(conn.execute(
+            select(canonical_topic_table.c.name, canonical_topic_table.c.id)
+            .where(canonical_topic_table.c.name.in_(chunk))
+        ).all())
+    claimed = set(canonical.values())
+
+    # A canonical with Jaccard >= threshold shares at least ceil(threshold * |A|) of
+    # name A's trigrams, so it holds one of A's |A| - ceil(threshold * |A|) + 1 rarest
+    # ones: only those posting lists are read, not the ever-growing common ones
+    grams = {n: name_trigrams(n) for n in wanted if n not in canonical}
+    frequency = Counter()
+    for chunk in _chunked(sorted(set().union(*grams.values()))):
+        frequency.update(dict(conn.execute(
+            select(topic_trigram_table.c.trigram, sa.func.count())
+            .where(topic_trigram_table.c.trigram.in_(chunk))
+            .group_by(topic_trigram_table.c.trigram)
+        ).all()))
+    probes = {
+        n: sorted(trigrams, key=lambda g: (frequency[g], g))[:len(trigrams) - math.ceil(threshold * len(trigrams)) + 1]
+        for n, trigrams in grams.items()
+    }
+    postings = defaultdict(list)  # trigram -> [canonical_id]
+    candidates = {}               # canonical_id -> (name, trigram_count)
+    for chunk in _chunked(sorted({g for probe in probes.values() for g in probe if frequency[g]})):
+        rows = conn.execute(
+            select(topic_trigram_table.c.trigram, canonical_topic_table.c.id,
+                   canonical_topic_table.c.name, canonical_topic_table.c.trigram_count)
+            .join(canonical_topic_table, canonical_topic_table.c.id == topic_trigram_table.c.canonical_id)
+            .where(topic_trigram_table.c.trigram.in_(chunk))
+        )
+        for trigram, canonical_id, name, count in rows:
+            postings[trigram].append(canonical_id)
+            candidates[canonical_id] = (name, count)
+
+    candidate_trigrams = {}
+    new_canonicals, new_trigrams = [], []
+    for n, trigrams in grams.items():
+        best, best_score = None, 0.0
+        for canonical_id in sorted({c for g in probes[n] for c in postings[g]} - claimed):
+            other, count = candidates[canonical_id]
+            # Jaccard is at most min(|A|, |B|) / max(|A|, |B|)
+            if min(count, len(trigrams)) < threshold * max(count, len(trigrams)):
+                continue
+            if canonical_id not in candidate_trigrams:
+                candidate_trigrams[canonical_id] = name_trigrams(other)
+            shared = len(trigrams & candidate_trigrams[canonical_id])
+            score = shared / (len(trigrams) + count - shared)
+            if score > best_score and _ordinals(other) == _ordinals(n):
+                best, best_score = canonical_id, score
+        if best is not None and best_score >= threshold:
+            canonical[n] = best
+        elif create:
+            canonical[n] = str(uuid.uuid4())
+            new_canonicals.append({"id": canonical[n], "name": n, "trigram_count": len(trigrams)})
+            new_trigrams.extend({"trigram": g, "canonical_id": canonical[n]} for g in trigrams)
+        if n in canonical:
+            claimed.add(canonical[n])
+
+    if new_canonicals:
+        conn.execute(insert(canonical_topic_table), new_canonicals)
+        conn.execute(insert(topic_trigram_table), new_trigrams)
+    return {name: canonical.get(n) for name, n in normalized.items()}
+
+
+def find_topics(engine: Engine, name: str):
+    """Topics in any graph that resolve to the same canonical topic as name."""
+    with engine.connect() as conn:
+        canonical_id = canonical_topic_ids(conn, [name], create=False)[name]
+        if canonical_id is None:
+            return []
+        stmt = (
+            select(topic_table.c.id, topic_table.c.name, topic_table.c.graph_id)
+            .join(topic_canonical_table, topic_canonical_table.c.topic_id == topic_table.c.id)
+            .where(topic_canonical_table.c.canonical_id == canonical_id)
+        )
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+def backfill_topic_canonical(engine: Engine, batch_size: int = 1000) -> int:
+    """Maps topics written before the canonical index existed. Returns how many were mapped."""
+    unmapped = (
+        select(topic_table.c.id, topic_table.c.name)
+        .outerjoin(topic_canonical_table, topic_canonical_table.c.topic_id == topic_table.c.id)
+        .where(topic_canonical_table.c.topic_id.is_(None))
+        .limit(batch_size)
+    )
+    mapped = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(unmapped).all()
+            if not rows:
+                return mapped
+            canonical = canonical_topic_ids(conn, [row.name for row in rows])
+            conn.execute(insert(topic_canonical_table), [
+                {"topic_id": row.id, "canonical_id": canonical[row.name]} for row in rows
+            ])
+        mapped += len(rows)
+
 # --- Topic Hierarchy ---
 def create_topic_hierarchy(engine: Engine, graph_id: str, topic_dict: dict):
-    """Creates topics and their connections from a dictionary of prerequisite -> dependent topics"""
-    topic_ids = {}
-    
+    """
+    Creates topics and their connections from a dictionary of prerequisite -> dependent topics.
+    A name resolves to the graph's topic with the same normalized name (see
+    normalize_topic_name), else to a new topic. Fuzzy canonical matches only link
+    topics across graphs; they never merge two topics of one graph.
+    The statement count depends on the number of new names, not on graph size.
+    """
     with engine.begin() as conn:
-        # Create topics
+        # Existing topics of this graph, by name and by normalized name
+        topic_ids, normalized_ids = {}, {}
+        for row in conn.execute(
+            select(topic_table.c.id, topic_table.c.name).where(topic_table.c.graph_id == graph_id)
+        ):
+            topic_ids[row.name] = row.id
+            normalized_ids.setdefault(normalize_topic_name(row.name), row.id)
+
+        # Existing edges of this graph
+        existing_edges = {
+            (row.from_topic_id, row.to_topic_id)
+            for row in conn.execute(
+                select(topic_connection_table.c.from_topic_id, topic_connection_table.c.to_topic_id)
+                .where(topic_connection_table.c.graph_id == graph_id)
+            )
+        }
+
+        # New topics, in first-seen order, unless the graph has the name in another spelling
+        new_topics = []
         for prereq_topic, dependent_topic in topic_dict.items():
-            # Create prerequisite topic if it doesn't exist
-            if prereq_topic not in topic_ids:
-                stmt = select(topic_table).where(topic_table.c.name == prereq_topic)
-                topic = conn.execute(stmt).first()
-                if not topic:
-                    topic_id = str(uuid.uuid4())
-                    stmt = insert(topic_table).values(
-                        id=topic_id,
-                        graph_id=graph_id,  # Changed from user_id to graph_id
-                        name=prereq_topic,
-                        description=None
-                    )
-                    conn.execute(stmt)
-                    topic_ids[prereq_topic] = topic_id
-                else:
-                    topic_ids[prereq_topic] = topic.id
-
-            # Create dependent topic if it doesn't exist and isn't "ROOT"
-            if dependent_topic != "ROOT" and dependent_topic not in topic_ids:
-                stmt = select(topic_table).where(topic_table.c.name == dependent_topic)
-                topic = conn.execute(stmt).first()
-                if not topic:
-                    topic_id = str(uuid.uuid4())
-                    stmt = insert(topic_table).values(
-                        id=topic_id,
-                        graph_id=graph_id,  # Changed from user_id to graph_id
-                        name=dependent_topic,
-                        description=None
-                    )
-                    conn.execute(stmt)
-                    topic_ids[dependent_topic] = topic_id
-                else:
-                    topic_ids[dependent_topic] = topic.id
-
-        # Create connections
+            names = [prereq_topic] if dependent_topic == "ROOT" else [prereq_topic, dependent_topic]
+            for name in names:
+                if name in topic_ids:
+                    continue
+                normalized = normalize_topic_name(name)
+                if normalized not in normalized_ids:
+                    normalized_ids[normalized] = str(uuid.uuid4())
+                    new_topics.append({
+                        "id": normalized_ids[normalized],
+                        "graph_id": graph_id,
+                        "name": name,
+                        "description": None
+                    })
+                topic_ids[name] = normalized_ids[normalized]
+        canonical = canonical_topic_ids(conn, [t["name"] for t in new_topics]) if new_topics else {}
+        new_mappings = [{"topic_id": t["id"], "canonical_id": canonical[t["name"]]} for t in new_topics]
+
+        # New connections
+        new_edges = []
         for prereq_topic, dependent_topic in topic_dict.items():
-            if dependent_topic != "ROOT":
-                stmt = select(topic_connection_table).where(
-                    sa.and_(
-                        topic_connection_table.c.from_topic_id == topic_ids[prereq_topic],
-                        topic_connection_table.c.to_topic_id == topic_ids[dependent_topic]
-                    )
-                )
-                if not conn.execute(stmt).first():
-                    stmt = insert(topic_connection_table).values(
-                        id=str(uuid.uuid4()),
-                        graph_id=graph_id,  # Changed from user_id to graph_id
-                        from_topic_id=topic_ids[prereq_topic],
-                        to_topic_id=topic_ids[dependent_topic]
-                    )
-                    conn.execute(stmt)
+            if dependent_topic == "ROOT":
+                continue
+            edge = (topic_ids[prereq_topic], topic_ids[dependent_topic])
+            # Two spellings of one name would otherwise give a self-loop
+            if edge[0] != edge[1] and edge not in existing_edges:
+                existing_edges.add(edge)
+                new_edges.append({
+                    "id": str(uuid.uuid4()),
+                    "graph_id": graph_id,
+                    "from_topic_id": edge[0],
+                    "to_topic_id": edge[1]
+                })
+
+        if new_topics:
+            conn.execute(insert(topic_table), new_topics)
+            conn.execute(insert(topic_canonical_table), new_mappings)
+            conn.execute(insert(topic_closure_table), [
+                {"graph_id": graph_id, "ancestor_id": t["id"], "descendant_id": t["id"], "depth": 0}
+                for t in new_topics
+            ])
+        if new_edges:
+            conn.execute(insert(topic_connection_table), new_edges)
+            close_edges(
+                conn, graph_id, [(e["from_topic_id"], e["to_topic_id"]) for e in new_edges], existing_edges
+            )
+        if new_topics or new_edges:
+            bump_graph_version(
+                conn, graph_id,
+                [("topic", t["id"]) for t in new_topics] + [("edge", e["id"]) for e in new_edges]
+            )
 
     return topic_ids
 
+# --- Reachability ---
+# Upper bound on interactive walks (neighbourhoods); the closure is always rebuilt in full
+MAX_WALK_DEPTH = int(os.getenv("MAX_WALK_DEPTH", "64"))
+
+
+def walk_topics(graph_id: str, roots, direction: str = "down", max_depth: int = None):
+    """
+    WITH RECURSIVE CTE of (root_id, topic_id, depth) rows: every topic of graph_id
+    within max_depth (at most MAX_WALK_DEPTH) edges of each root, following edges
+    toward dependents ("down"), prerequisites ("up") or either ("both"). roots is a
+    list of topic ids or a subquery of them. A topic can appear at several depths;
+    take min(depth). Meant for small, interactive walks, not whole-graph closure.
+    """
+    c = topic_connection_table.c
+    down = select(c.from_topic_id.label("src"), c.to_topic_id.label("dst")).where(c.graph_id == graph_id)
+    up = select(c.to_topic_id.label("src"), c.from_topic_id.label("dst")).where(c.graph_id == graph_id)
+    edges = {"down": down, "up": up, "both": sa.union_all(down, up)}[direction].subquery("edges")
+
+    walk = (
+        select(
+            topic_table.c.id.label("root_id"), topic_table.c.id.label("topic_id"),
+            sa.literal(0).label("depth")
+        )
+        .where(topic_table.c.graph_id == graph_id, topic_table.c.id.in_(roots))
+        .cte("walk", recursive=True)
+    )
+    return walk.union(
+        select(walk.c.root_id, edges.c.dst, walk.c.depth + 1)
+        .join(edges, edges.c.src == walk.c.topic_id)
+        .where(walk.c.depth < min(max_depth or MAX_WALK_DEPTH, MAX_WALK_DEPTH))
+    )
+
+
+def get_topic_neighborhood(engine: Engine, topic_id: str, hops: int = 1, direction: str = "both"):
+    """
+    Topics within `hops` edges of topic_id in its own graph, with their distance,
+    and the edges among them. Only that subgraph is read from the database.
+    """
+    with engine.connect() as conn:
+        graph_id = conn.execute(select(topic_table.c.graph_id).where(topic_table.c.id == topic_id)).scalar()
+        if graph_id is None:
+            return None
+        walk = walk_topics(graph_id, [topic_id], direction, hops)
+        nodes = [
+            dict(row._mapping)
+            for row in conn.execute(
+                select(topic_table.c.id, topic_table.c.name, sa.func.min(walk.c.depth).label("depth"))
+                .join(walk, walk.c.topic_id == topic_table.c.id)
+                .group_by(topic_table.c.id, topic_table.c.name)
+                .order_by("depth", topic_table.c.name)
+            )
+        ]
+        reached = select(walk.c.topic_id)
+        edges = [
+            dict(row._mapping)
+            for row in conn.execute(
+                select(
+                    topic_connection_table.c.id,
+                    topic_connection_table.c.from_topic_id,
+                    topic_connection_table.c.to_topic_id
+                ).where(
+                    topic_connection_table.c.graph_id == graph_id,
+                    topic_connection_table.c.from_topic_id.in_(reached),
+                    topic_connection_table.c.to_topic_id.in_(reached)
+                )
+            )
+        ]
+    return {"graph_id": graph_id, "nodes": nodes, "edges": edges}
+
+
+def _bfs(adjacency: dict, sources) -> dict:
+    """Fewest edges from the nearest of sources to every node they reach, sources included."""
+    depths = dict.fromkeys(sources, 0)
+    frontier = list(depths)
+    while frontier:
+        reached = []
+        for node in frontier:
+            for nxt in adjacency.get(node, ()):
+                if nxt not in depths:
+                    depths[nxt] = depths[node] + 1
+                    reached.append(nxt)
+        frontier = reached
+    return depths
+
+
+def _write_closure(conn, graph_id: str, edges, ancestors, upsert: bool, batch_size: int = 10000):
+    """
+    Writes the closure rows of each of ancestors, walked by BFS over edges, in
+    executemany batches. upsert overwrites existing depths (they can only shrink).
+    """
+    children = defaultdict(list)
+    for from_topic_id, to_topic_id in edges:
+        children[from_topic_id].append(to_topic_id)
+
+    stmt = insert(topic_closure_table)
+    if upsert:
+        stmt = sqlite_insert(topic_closure_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[topic_closure_table.c.ancestor_id, topic_closure_table.c.descendant_id],
+            set_={"depth": stmt.excluded.depth}
+        )
+    rows = []
+    for ancestor_id in ancestors:
+        for descendant_id, depth in _bfs(children, [ancestor_id]).items():
+            if depth or not upsert:
+                rows.append({"graph_id": graph_id, "ancestor_id": ancestor_id,
+                             "descendant_id": descendant_id, "depth": depth})
+        if len(rows) >= batch_size:
+            conn.execute(stmt, rows)
+            rows = []
+    if rows:
+        conn.execute(stmt, rows)
+
+
+def _graph_edges(conn, graph_id: str) -> list:
+    c = topic_connection_table.c
+    return conn.execute(select(c.from_topic_id, c.to_topic_id).where(c.graph_id == graph_id)).all()
+
+
+def close_edges(conn, graph_id: str, edges: list, graph_edges=None):
+    """
+    Extends topic_closure after new (prerequisite, dependent) edges were written to
+    graph_id. Only topics that reach a new edge's prerequisite gain paths, so only
+    those are re-walked, over graph_edges (every edge of the graph, new ones
+    included; read in one query if not given), and upserted in a few executemany
+    batches however many edges are new. Both endpoints need their depth-0 rows.
+    """
+    if graph_edges is None:
+        graph_edges = _graph_edges(conn, graph_id)
+    parents = defaultdict(list)
+    for from_topic_id, to_topic_id in graph_edges:
+        parents[to_topic_id].append(from_topic_id)
+    affected = _bfs(parents, [from_topic_id for from_topic_id, _ in edges])
+    _write_closure(conn, graph_id, graph_edges, affected, upsert=True)
+
+
+def rebuild_topic_closure(conn, graph_id: str):
+    """Recomputes graph_id's closure from its edges, by BFS from every topic, so depths are exact at any length."""
+    topic_ids = conn.execute(select(topic_table.c.id).where(topic_table.c.graph_id == graph_id)).scalars().all()
+    edges = _graph_edges(conn, graph_id)
+    conn.execute(delete(topic_closure_table).where(topic_closure_table.c.graph_id == graph_id))
+    _write_closure(conn, graph_id, edges, topic_ids, upsert=False)
+
+
+def backfill_topic_closure(engine: Engine) -> int:
+    """Rebuilds the closure of every graph with topics written before it existed. Returns the graph count."""
+    reflexive = topic_closure_table.alias("reflexive")
+    stale = (
+        select(topic_table.c.graph_id).distinct()
+        .outerjoin(reflexive, sa.and_(
+            reflexive.c.ancestor_id == topic_table.c.id,
+            reflexive.c.descendant_id == topic_table.c.id
+        ))
+        .where(reflexive.c.ancestor_id.is_(None))
+    )
+    with engine.connect() as conn:
+        graph_ids = list(conn.execute(stale).scalars())
+    for graph_id in graph_ids:
+        with engine.begin() as conn:
+            rebuild_topic_closure(conn, graph_id)
+    return len(graph_ids)
+
+
+def _closure_topics(engine: Engine, match, other, topic_id: str, max_depth: int = None):
+    stmt = (
+        select(topic_table.c.id, topic_table.c.name, topic_closure_table.c.depth)
+        .join(topic_closure_table, other == topic_table.c.id)
+        .where(match == topic_id, topic_closure_table.c.depth > 0)
+        .order_by(topic_closure_table.c.depth, topic_table.c.name)
+    )
+    if max_depth is not None:
+        stmt = stmt.where(topic_closure_table.c.depth <= max_depth)
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+def get_topic_ancestors(engine: Engine, topic_id: str, max_depth: int = None):
+    """Every topic that must be learned before topic_id, nearest first, with its distance."""
+    return _closure_topics(
+        engine, topic_closure_table.c.descendant_id, topic_closure_table.c.ancestor_id, topic_id, max_depth
+    )
+
+
+def get_topic_descendants(engine: Engine, topic_id: str, max_depth: int = None):
+    """Every topic that builds on topic_id, nearest first, with its distance."""
+    return _closure_topics(
+        engine, topic_closure_table.c.ancestor_id, topic_closure_table.c.descendant_id, topic_id, max_depth
+    )
+
+
+def topic_requires(engine: Engine, topic_id: str, prerequisite_id: str):
+    """Shortest distance from prerequisite_id to topic_id, or None if topic_id doesn't depend on it."""
+    stmt = select(topic_closure_table.c.depth).where(
+        topic_closure_table.c.ancestor_id == prerequisite_id,
+        topic_closure_table.c.descendant_id == topic_id
+    )
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar()
+
+# --- Decomposition Cache ---
+def normalize_prompt(prompt: str) -> str:
+    """Casefolds, strips punctuation and collapses whitespace so trivially different prompts share an entry."""
+    text = re.sub(r"[^\w\s]", " ", prompt.casefold())
+    return " ".join(text.split())
+
+
+def decomposition_key(prompt: str, model_id: str, template_hash: str) -> str:
+    raw = "\x1f".join((normalize_prompt(prompt), model_id, template_hash))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_decomposition(engine: Engine, prompt: str, model_id: str, template_hash: str, ttl: float):
+    """Returns the cached hierarchy dict, or None if absent or older than ttl seconds."""
+    key = decomposition_key(prompt, model_id, template_hash)
+    now = datetime.now(timezone.utc)
+    stmt = select(decomposition_cache_table.c.hierarchy).where(
+        decomposition_cache_table.c.id == key,
+        decomposition_cache_table.c.created_at >= now - timedelta(seconds=ttl)
+    )
+    with engine.begin() as conn:
+        hierarchy = conn.execute(stmt).scalar()
+        if hierarchy is None:
+            return None
+        conn.execute(
+            update(decomposition_cache_table)
+            .where(decomposition_cache_table.c.id == key)
+            .values(last_used_at=now)
+        )
+    return json.loads(hierarchy)
+
+
+def store_decomposition(engine: Engine, prompt: str, model_id: str, template_hash: str,
+                        hierarchy: dict, max_entries: int):
+    """Caches a parsed hierarchy, then trims the table to the max_entries most recently used rows."""
+    now = datetime.now(timezone.utc)
+    stmt = sqlite_insert(decomposition_cache_table).values(
+        id=decomposition_key(prompt, model_id, template_hash),
+        prompt=normalize_prompt(prompt),
+        model_id=model_id,
+        template_hash=template_hash,
+        hierarchy=json.dumps(hierarchy),
+        created_at=now,
+        last_used_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[decomposition_cache_table.c.id],
+        set_={"hierarchy": stmt.excluded.hierarchy, "created_at": now, "last_used_at": now}
+    )
+    keep = (
+        select(decomposition_cache_table.c.id)
+        .order_by(decomposition_cache_table.c.last_used_at.desc())
+        .limit(max_entries)
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt)
+        conn.execute(delete(decomposition_cache_table).where(decomposition_cache_table.c.id.not_in(keep)))
+
+
+def purge_decompositions(engine: Engine, prompt: str = None):
+    """Deletes every cached decomposition, or only those for one prompt. Returns the number removed."""
+    stmt = delete(decomposition_cache_table)
+    if prompt is not None:
+        stmt = stmt.where(decomposition_cache_table.c.prompt == normalize_prompt(prompt))
+    with engine.begin() as conn:
+        return conn.execute(stmt).rowcount
+
+def get_upload_text(engine: Engine, upload_id: str):
+    """Returns an upload's OCR text, or None if the upload is unknown or not OCR'd yet."""
+    stmt = select(upload_table.c.ocr_text).where(upload_table.c.id == upload_id)
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar()
+
+
+# --- RAG ingestion bookkeeping ---
+def get_ingested_hashes(engine: Engine, vector_db_id: str, hashes: list) -> set:
+    """Returns the subset of chunk hashes already inserted into vector_db_id."""
+    found = set()
+    with engine.connect() as conn:
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(hashes), 500):
+            found.update(conn.execute(
+                select(ingested_chunk_table.c.chunk_hash).where(
+                    ingested_chunk_table.c.vector_db_id == vector_db_id,
+                    ingested_chunk_table.c.chunk_hash.in_(hashes[i:i + 500])
+                )
+            ).scalars())
+    return found
+
+
+def record_ingested_chunks(engine: Engine, vector_db_id: str, document_id: str, hashes: list):
+    if not hashes:
+        return
+    stmt = sqlite_insert(ingested_chunk_table).on_conflict_do_nothing()
+    with engine.begin() as conn:
+        conn.execute(stmt, [
+            {"vector_db_id": vector_db_id, "chunk_hash": h, "document_id": document_id}
+            for h in hashes
+        ])
+
+
+def set_ingestion_status(engine: Engine, document_id: str, vector_db_id: str, source: str,
+                         status: str, **counts):
+    """Upserts the status row of one ingestion run; counts may set total_chunks, new_chunks or error."""
+    values = {"status": status, "updated_at": datetime.now(timezone.utc), **counts}
+    stmt = sqlite_insert(ingestion_status_table).values(
+        document_id=document_id, vector_db_id=vector_db_id, source=source, **values
+    )
+    stmt = stmt.on_conflict_do_update(index_elements=[ingestion_status_table.c.document_id], set_=values)
+    with engine.begin() as conn:
+        conn.execute(stmt)
+
+
+def get_ingestion_status(engine: Engine, document_id: str):
+    stmt = select(ingestion_status_table).where(ingestion_status_table.c.document_id == document_id)
+    with engine.connect() as conn:
+        row = conn.execute(stmt).mappings().first()
+    return dict(row) if row else None
+
 def get_graph_by_id(engine: Engine, graph_id: str):
     """
     Retrieves all topics and their connections for a given graph.
-    Returns a dictionary with 'nodes' and 'edges' lists.
+    Returns a dictionary with the graph 'version' and 'nodes' and 'edges' lists.
+    The version is read first, so it never claims newer data than was returned.
     """
     # Get all topics (nodes) for the graph
     topics_stmt = select(
@@ -180,6 +895,8 @@ def get_graph_by_id(engine: Engine, graph_id: str):
     ).where(topic_connection_table.c.graph_id == graph_id)
     
     with engine.connect() as conn:
+        version = _graph_version(conn, graph_id)
+
         # Fetch nodes
         nodes = [
             {
@@ -203,6 +920,7 @@ def get_graph_by_id(engine: Engine, graph_id: str):
         ]
         
         return {
+            "version": version,
             "nodes": nodes,
             "edges": edges
         }
@@ -1,2 +1,49 @@
-import sqlite3
+import os
 
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# Separate from DATABASE_URL, which points the backend/ app at Postgres
+SQLITE_URL = os.getenv("SQLITE_URL", "sqlite:///./test.db")
+
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB, so 64 MiB
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+}
+
+# WAL lets readers run alongside the single writer, so reads get a wider pool
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "1"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def make_engine(url: str = SQLITE_URL, pool_size: int = 5, readonly: bool = False):
+    """Creates a pooled engine whose SQLite connections get SQLITE_PRAGMAS applied on connect."""
+    engine = sa.create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=POOL_TIMEOUT,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if readonly:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    return engine
+
+
+write_engine = make_engine(pool_size=WRITE_POOL_SIZE)
+read_engine = make_engine(pool_size=READ_POOL_SIZE, readonly=True)
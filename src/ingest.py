@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import os
+import re
+
+from fastapi.concurrency import run_in_threadpool
+from llama_stack_client import RAGDocument
+
+from crud import get_ingested_hashes, record_ingested_chunks, set_ingestion_status
+from db import write_engine
+from retrieval_cache import retrieval_cache
+
+# Words per chunk; chunk_size_in_tokens is set well above it so the server never re-splits
+INGEST_CHUNK_WORDS = int(os.getenv("INGEST_CHUNK_WORDS", "200"))
+# Chunks sent per rag_tool.insert call
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+_running = set()
+
+
+def chunk_text(text: str, words: int = INGEST_CHUNK_WORDS) -> list:
+    """Splits text into chunks of at most `words` whitespace-separated words."""
+    tokens = text.split()
+    return [" ".join(tokens[i:i + words]) for i in range(0, len(tokens), words)]
+
+
+def chunk_hash(chunk: str) -> str:
+    # Whitespace and case differences from OCR/PDF extraction shouldn't defeat dedup
+    return hashlib.sha256(re.sub(r"\s+", " ", chunk).strip().lower().encode("utf-8")).hexdigest()
+
+
+async def ingest_text(client, vector_db_id: str, document_id: str, source: str, text: str) -> int:
+    """
+    Inserts the chunks of text that vector_db_id does not hold yet and returns how
+    many were new. Hashes are recorded after each successful batch, so a failed
+    run resumes where it stopped.
+    """
+    chunks = {}
+    for chunk in chunk_text(text):
+        chunks.setdefault(chunk_hash(chunk), chunk)
+    known = await run_in_threadpool(get_ingested_hashes, write_engine, vector_db_id, list(chunks))
+    new = [(h, c) for h, c in chunks.items() if h not in known]
+    await run_in_threadpool(
+        set_ingestion_status, write_engine, document_id, vector_db_id, source, "running",
+        total_chunks=len(chunks), new_chunks=len(new)
+    )
+
+    for i in range(0, len(new), INGEST_BATCH_SIZE):
+        batch = new[i:i + INGEST_BATCH_SIZE]
+        await client.tool_runtime.rag_tool.insert(
+            documents=[
+                RAGDocument(
+                    document_id=f"chunk-{h}",
+                    content=c,
+                    mime_type="text/plain",
+                    metadata={"source": source, "document_id": document_id},
+                )
+                for h, c in batch
+            ],
+            vector_db_id=vector_db_id,
+            chunk_size_in_tokens=INGEST_CHUNK_WORDS * 4,
+        )
+        retrieval_cache.invalidate(vector_db_id)
+        await run_in_threadpool(
+            record_ingested_chunks, write_engine, vector_db_id, document_id, [h for h, _ in batch]
+        )
+    return len(new)
+
+
+async def _run(client, vector_db_id: str, document_id: str, source: str, load_text):
+    try:
+        text = await load_text()
+        await ingest_text(client, vector_db_id, document_id, source, text or "")
+    except Exception as e:
+        await run_in_threadpool(
+            set_ingestion_status, write_engine, document_id, vector_db_id, source, "failed", error=str(e)
+        )
+    else:
+        await run_in_threadpool(
+            set_ingestion_status, write_engine, document_id, vector_db_id, source, "done", error=None
+        )
+
+
+async def start_ingestion(client, vector_db_id: str, document_id: str, source: str, load_text):
+    """
+    Records a pending status row and ingests in the background. load_text is a
+    coroutine function producing the text, so extraction happens off the request too.
+    """
+    await run_in_threadpool(
+        set_ingestion_status, write_engine, document_id, vector_db_id, source, "pending",
+        total_chunks=0, new_chunks=0, error=None
+    )
+    task = asyncio.ensure_future(_run(client, vector_db_id, document_id, source, load_text))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 
 class UserCreate(BaseModel):
@@ -18,4 +18,12 @@ class GraphCreate(BaseModel):
 class GraphResponse(BaseModel):
     id: str
     user_id: str
-    name: str
\ No newline at end of file
+    name: str
+
+class KnowledgeUpdate(BaseModel):
+    topic_id: str
+    status: int = Field(ge=1, le=100)
+
+class KnowledgeBatch(BaseModel):
+    user_id: str
+    items: list[KnowledgeUpdate]
@@ -0,0 +1,98 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 2)))
+# Pages handed to a worker at a time; each task re-opens the file, so not too small
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    # pdfplumber is pure-Python and holds the GIL, so pages are parsed in processes
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def spool_upload(upload: UploadFile, chunk_size: int = CHUNK_SIZE) -> str:
+    """Copies an upload to a temporary file chunk by chunk and returns its path."""
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await upload.read(chunk_size):
+                await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def discard_spool(path: str):
+    """Removes a spooled upload; a no-op once it is gone, so every exit path can call it."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def count_pages(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pages(path: str, start: int, stop: int) -> list:
+    """Runs in a worker process: text of pages [start, stop)."""
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+async def iter_page_texts(path: str):
+    """
+    Yields page texts in page order, each as soon as it and every earlier page
+    are extracted. At most two tasks per worker are in flight, so memory stays
+    bounded however large the document is.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    pages = await loop.run_in_executor(executor, count_pages, path)
+
+    starts = iter(range(0, pages, PDF_PAGES_PER_TASK))
+    in_flight = deque()
+
+    def submit():
+        start = next(starts, None)
+        if start is not None:
+            stop = min(start + PDF_PAGES_PER_TASK, pages)
+            in_flight.append(loop.run_in_executor(executor, extract_pages, path, start, stop))
+
+    for _ in range(2 * PDF_WORKERS):
+        submit()
+    try:
+        while in_flight:
+            texts = await in_flight.popleft()
+            submit()
+            for text in texts:
+                yield text
+    finally:
+        for future in in_flight:
+            future.cancel()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+
+
+def normalize_query(query: str) -> str:
+    # Same topic typed by different users should share an entry
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class RetrievalCache:
+    """
+    LRU of knowledge_search results keyed by (vector_db_id, normalized query, top_k).
+    Entries expire after ttl seconds, and everything for a vector DB is dropped
+    when ingestion adds to it. Concurrent misses for one key share one fetch.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE, ttl: float = RETRIEVAL_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (result, stored_at)
+        self._pending = {}             # key -> task fetching it
+        self._generations = {}         # vector_db_id -> invalidation count
+
+    async def get(self, vector_db_id: str, query: str, top_k: int, fetch):
+        """Returns the cached result, or awaits fetch() and caches what it returns."""
+        key = (vector_db_id, normalize_query(query), top_k)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self._entries.pop(key, None)
+        self.misses += 1
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(fetch())
+            self._pending[key] = pending
+            generation = self._generations.get(vector_db_id, 0)
+            try:
+                result = await pending
+            finally:
+                self._pending.pop(key, None)
+            # Results fetched across an invalidation may miss the new documents
+            if self._generations.get(vector_db_id, 0) == generation:
+                self._entries[key] = (result, time.monotonic())
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return result
+        return await pending
+
+    def invalidate(self, vector_db_id: str):
+        self._generations[vector_db_id] = self._generations.get(vector_db_id, 0) + 1
+        for key in [k for k in self._entries if k[0] == vector_db_id]:
+            del self._entries[key]
+
+    def clear(self):
+        for vector_db_id in {k[0] for k in self._entries} | {k[0] for k in self._pending}:
+            self.invalidate(vector_db_id)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+retrieval_cache = RetrievalCache()
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+class SessionPool:
+    """
+    Agent sessions created lazily per key (a user id). Keeps at most max_sessions
+    alive, evicting the least recently used, and recycles any session idle for
+    longer than ttl seconds. Sessions leased for a turn are never evicted until
+    the lease ends; the pool may exceed max_sessions meanwhile.
+    """
+
+    def __init__(self, agent, name: str, max_sessions: int = 256, ttl: float = 1800):
+        self.agent = agent
+        self.name = name
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # key -> (session_id, last_used)
+        self._pending = {}              # key -> task creating its session
+        self._leases = {}               # key -> turns currently using its session
+        self._cleanup = set()
+
+    @asynccontextmanager
+    async def lease(self, key):
+        """Yields key's session id, pinned against eviction and expiry until the block exits."""
+        self._leases[key] = self._leases.get(key, 0) + 1
+        try:
+            yield await self.get(key)
+        finally:
+            self._leases[key] -= 1
+            if not self._leases[key]:
+                del self._leases[key]
+                # Idle time counts from the end of the turn, not its start
+                entry = self._sessions.get(key)
+                if entry is not None:
+                    self._sessions[key] = (entry[0], time.monotonic())
+                    self._sessions.move_to_end(key)
+                self._evict()
+
+    async def get(self, key) -> str:
+        self._evict()
+
+        entry = self._sessions.get(key)
+        if entry is not None:
+            self._sessions[key] = (entry[0], time.monotonic())
+            self._sessions.move_to_end(key)
+            return entry[0]
+
+        # Concurrent first requests for the same key share one creation
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await pending
+
+        pending = asyncio.ensure_future(self.agent.create_session(f"{self.name}-{key}"))
+        self._pending[key] = pending
+        try:
+            session_id = await pending
+        finally:
+            self._pending.pop(key, None)
+
+        self._sessions[key] = (session_id, time.monotonic())
+        self._evict()
+        return session_id
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self):
+        # Oldest first: expired sessions, then any beyond max_sessions, skipping leased ones
+        cutoff = time.monotonic() - self.ttl
+        excess = len(self._sessions) - self.max_sessions
+        victims = []
+        for key, (_, last_used) in self._sessions.items():
+            if excess <= 0 and last_used > cutoff:
+                break
+            if key not in self._leases:
+                victims.append(key)
+                excess -= 1
+        for key in victims:
+            self._drop(self._sessions.pop(key)[0])
+
+    def _drop(self, session_id: str):
+        if session_id in self.agent.sessions:
+            self.agent.sessions.remove(session_id)
+        task = asyncio.ensure_future(self._delete(session_id))
+        self._cleanup.add(task)
+        task.add_done_callback(self._cleanup.discard)
+
+    async def _delete(self, session_id: str):
+        # Best effort: a session the server already forgot is fine to lose
+        try:
+            await self.agent.client.agents.session.delete(
+                agent_id=self.agent.agent_id, session_id=session_id
+            )
+        except Exception:
+            pass
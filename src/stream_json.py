@@ -0,0 +1,76 @@
+import json
+
+# Parser states
+START, OPEN, KEY, COLON, VALUE_START, VALUE, AFTER_VALUE, NEXT_KEY, DONE = range(9)
+
+
+class PairStreamParser:
+    """
+    Incremental parser for a flat JSON object of string keys to string values,
+    the shape the decomposition agent is asked to return.
+
+    feed() takes arbitrary slices of the token stream and returns the
+    "key": "value" pairs completed by that slice. It raises ValueError as soon
+    as the text can no longer be such an object, so callers can stop the
+    generation instead of paying for the rest of it.
+    """
+
+    def __init__(self):
+        self.state = START
+        self.key = None
+        self._buf = []
+        self._escaped = False
+
+    def feed(self, text: str):
+        pairs = []
+        for ch in text:
+            state = self.state
+            if state in (KEY, VALUE):
+                if self._escaped:
+                    self._escaped = False
+                    self._buf.append(ch)
+                elif ch == "\\":
+                    self._escaped = True
+                    self._buf.append(ch)
+                elif ch == '"':
+                    string = self._decode()
+                    if state == KEY:
+                        self.key = string
+                        self.state = COLON
+                    else:
+                        pairs.append((self.key, string))
+                        self.state = AFTER_VALUE
+                else:
+                    self._buf.append(ch)
+                continue
+
+            if ch.isspace():
+                continue
+            if state == START and ch == "{":
+                self.state = OPEN
+            elif state in (OPEN, NEXT_KEY) and ch == '"':
+                self.state = KEY
+            elif state == COLON and ch == ":":
+                self.state = VALUE_START
+            elif state == VALUE_START and ch == '"':
+                self.state = VALUE
+            elif state == AFTER_VALUE and ch == ",":
+                self.state = NEXT_KEY
+            elif state in (OPEN, AFTER_VALUE) and ch == "}":
+                self.state = DONE
+            else:
+                raise ValueError(f"Unexpected {ch!r} in decomposition stream")
+        return pairs
+
+    def close(self):
+        """Raises ValueError unless the stream formed one complete object."""
+        if self.state != DONE:
+            raise ValueError("Decomposition stream ended before the object was closed")
+
+    def _decode(self) -> str:
+        raw = "".join(self._buf)
+        self._buf = []
+        try:
+            return json.loads('"' + raw + '"')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid string in decomposition stream: {e}") from e
@@ -1,9 +1,9 @@
 import sqlalchemy as sa
 import uuid
 
+from db import write_engine as engine
+
 metadata = sa.MetaData()
-engine = sa.create_engine("sqlite:///./test.db", connect_args={"check_same_thread": False})
-conn = engine.connect()
 
 
 user_table = sa.Table(
@@ -32,6 +32,7 @@ topic_table = sa.Table(
     sa.Column("graph_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
     sa.Column("name", sa.String(100), nullable=False),
     sa.Column("description", sa.Text),
+    sa.Index("ix_topics_graph_id_name", "graph_id", "name"),
 )
 
 topic_connection_table = sa.Table(
@@ -41,6 +42,9 @@ topic_connection_table = sa.Table(
     sa.Column("graph_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
     sa.Column("from_topic_id", sa.String(36), sa.ForeignKey("topics.id"), nullable=False),
     sa.Column("to_topic_id", sa.String(36), sa.ForeignKey("topics.id"), nullable=False),
+    # Also serves graph_id-only reads; to_topic_id makes prerequisite-ward walks indexed
+    sa.Index("ix_topic_connections_graph_id_to_topic_id", "graph_id", "to_topic_id"),
+    sa.Index("uq_topic_connections_from_to", "from_topic_id", "to_topic_id", unique=True),
 )
 
 user_knowledge_table = sa.Table(
@@ -50,6 +54,7 @@ user_knowledge_table = sa.Table(
     sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
     sa.Column("topic_id", sa.String(36), sa.ForeignKey("topics.id"), nullable=False),
     sa.Column("status", sa.Integer, sa.CheckConstraint('status >= 1 AND status <= 100'), nullable=False, default=1),
+    sa.Index("uq_user_knowledge_user_id_topic_id", "user_id", "topic_id", unique=True),
 )
 
 upload_table = sa.Table(
@@ -62,4 +67,141 @@ upload_table = sa.Table(
     sa.Column("uploaded_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
 )
 
-metadata.create_all(engine)
\ No newline at end of file
+# Per-graph counter bumped by every topic/edge write; exposed as the /getgraph ETag
+graph_version_table = sa.Table(
+    "graph_versions",
+    metadata,
+    sa.Column("graph_id", sa.String(36), primary_key=True),
+    sa.Column("version", sa.Integer, nullable=False, default=0),
+)
+
+# Which topics/edges each graph version touched, for delta reads
+graph_change_table = sa.Table(
+    "graph_changes",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+    sa.Column("graph_id", sa.String(36), nullable=False),
+    sa.Column("version", sa.Integer, nullable=False),
+    sa.Column("kind", sa.String(10), nullable=False),  # "topic" or "edge"
+    sa.Column("entity_id", sa.String(36), nullable=False),
+    sa.Index("ix_graph_changes_graph_id_version", "graph_id", "version"),
+)
+
+# Parsed /decomp hierarchies; id is a hash of (normalized prompt, model id, template hash)
+decomposition_cache_table = sa.Table(
+    "decomposition_cache",
+    metadata,
+    sa.Column("id", sa.String(64), primary_key=True),
+    sa.Column("prompt", sa.Text, nullable=False),
+    sa.Column("model_id", sa.String(255), nullable=False),
+    sa.Column("template_hash", sa.String(64), nullable=False),
+    sa.Column("hierarchy", sa.Text, nullable=False),
+    sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    sa.Column("last_used_at", sa.DateTime(timezone=True), nullable=False, index=True),
+)
+
+# Reachability index: one row per (prerequisite, dependent) pair connected by a path,
+# with the shortest path length as depth; every topic also reaches itself at depth 0
+topic_closure_table = sa.Table(
+    "topic_closure",
+    metadata,
+    sa.Column("graph_id", sa.String(36), nullable=False),
+    sa.Column("ancestor_id", sa.String(36), sa.ForeignKey("topics.id"), primary_key=True),
+    sa.Column("descendant_id", sa.String(36), sa.ForeignKey("topics.id"), primary_key=True),
+    sa.Column("depth", sa.Integer, nullable=False),
+    sa.Index("ix_topic_closure_descendant_id_ancestor_id", "descendant_id", "ancestor_id"),
+    # delete_graph and rebuild_topic_closure work graph by graph
+    sa.Index("ix_topic_closure_graph_id", "graph_id"),
+)
+
+# Topics each user can study next in a graph: not yet mastered, every prerequisite mastered
+learning_frontier_table = sa.Table(
+    "learning_frontier",
+    metadata,
+    sa.Column("user_id", sa.String(36), primary_key=True),
+    sa.Column("graph_id", sa.String(36), primary_key=True),
+    sa.Column("topic_id", sa.String(36), primary_key=True),
+)
+
+# Graph version each (user, graph) frontier was built against; stale ones are rebuilt on read
+frontier_state_table = sa.Table(
+    "frontier_state",
+    metadata,
+    sa.Column("user_id", sa.String(36), primary_key=True),
+    sa.Column("graph_id", sa.String(36), primary_key=True),
+    sa.Column("version", sa.Integer, nullable=False),
+)
+
+# One row per distinct topic across all graphs; name is normalize_topic_name() output
+canonical_topic_table = sa.Table(
+    "canonical_topics",
+    metadata,
+    sa.Column("id", sa.String(36), primary_key=True, default=lambda: str(uuid.uuid4())),
+    sa.Column("name", sa.String(100), nullable=False, unique=True),
+    sa.Column("trigram_count", sa.Integer, nullable=False),
+)
+
+# Inverted trigram index over canonical names, for near-duplicate lookups
+topic_trigram_table = sa.Table(
+    "topic_trigrams",
+    metadata,
+    sa.Column("trigram", sa.String(3), primary_key=True),
+    sa.Column("canonical_id", sa.String(36), sa.ForeignKey("canonical_topics.id"), primary_key=True),
+)
+
+# Which canonical topic each per-graph topic row stands for; topic rows themselves stay per graph
+topic_canonical_table = sa.Table(
+    "topic_canonical",
+    metadata,
+    sa.Column("topic_id", sa.String(36), sa.ForeignKey("topics.id"), primary_key=True),
+    sa.Column("canonical_id", sa.String(36), sa.ForeignKey("canonical_topics.id"), nullable=False, index=True),
+)
+
+# Content hashes of chunks already inserted into each vector DB
+ingested_chunk_table = sa.Table(
+    "ingested_chunks",
+    metadata,
+    sa.Column("vector_db_id", sa.String(255), primary_key=True),
+    sa.Column("chunk_hash", sa.String(64), primary_key=True),
+    sa.Column("document_id", sa.String(100), nullable=False),
+    sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+)
+
+# One row per ingestion run: pending -> running -> done | failed
+ingestion_status_table = sa.Table(
+    "ingestion_status",
+    metadata,
+    sa.Column("document_id", sa.String(100), primary_key=True),
+    sa.Column("vector_db_id", sa.String(255), nullable=False),
+    sa.Column("source", sa.String(255), nullable=False),
+    sa.Column("status", sa.String(20), nullable=False),
+    sa.Column("total_chunks", sa.Integer, nullable=False, default=0),
+    sa.Column("new_chunks", sa.Integer, nullable=False, default=0),
+    sa.Column("error", sa.Text),
+    sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+)
+
+metadata.create_all(engine)
+
+# One-time step before the unique (user_id, topic_id) index: keep each pair's
+# highest-status row (on ties the lowest id, an arbitrary pick since ids are
+# random uuids) and drop the old non-unique index
+if "uq_user_knowledge_user_id_topic_id" not in {i["name"] for i in sa.inspect(engine).get_indexes("user_knowledge")}:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "DELETE FROM user_knowledge WHERE EXISTS ("
+            "SELECT 1 FROM user_knowledge AS b "
+            "WHERE b.user_id = user_knowledge.user_id AND b.topic_id = user_knowledge.topic_id "
+            "AND (b.status > user_knowledge.status "
+            "OR (b.status = user_knowledge.status AND b.id < user_knowledge.id)))"
+        )
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_user_knowledge_user_id_topic_id")
+
+# Superseded by ix_topic_connections_graph_id_to_topic_id
+with engine.begin() as conn:
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_topic_connections_graph_id")
+
+# create_all skips indexes of tables that already exist, so add any missing ones
+for table in metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
\ No newline at end of file
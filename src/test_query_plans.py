@@ -0,0 +1,95 @@
+"""
+Fails if any hot-path query falls back to a full table scan.
+
+Run from src/:  python -m pytest test_query_plans.py  (or python test_query_plans.py)
+"""
+import os
+import sys
+import tempfile
+
+import sqlalchemy as sa
+from sqlalchemy import select
+
+# Importing tables creates the schema on SQLITE_URL; point it at a scratch file for the
+# import, whatever the caller has set, so no real database (or the tracked test.db) is touched
+_scratch = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+_sqlite_url = os.environ.get("SQLITE_URL")
+os.environ["SQLITE_URL"] = f"sqlite:///{os.path.join(_scratch.name, 'query_plans.db')}"
+try:
+    from tables import (
+        metadata, topic_table, topic_connection_table, user_knowledge_table,
+        canonical_topic_table, topic_trigram_table, topic_canonical_table, learning_frontier_table,
+        topic_closure_table
+    )
+finally:
+    if _sqlite_url is None:
+        del os.environ["SQLITE_URL"]
+    else:
+        os.environ["SQLITE_URL"] = _sqlite_url
+
+HOT_QUERIES = {
+    "get_graph_by_id topics": select(topic_table.c.id).where(topic_table.c.graph_id == "g"),
+    "get_graph_by_id edges": select(topic_connection_table.c.id).where(
+        topic_connection_table.c.graph_id == "g"
+    ),
+    "create_topic_hierarchy topic by name": select(topic_table.c.id).where(
+        topic_table.c.graph_id == "g", topic_table.c.name == "n"
+    ),
+    "walk_topics up step": select(topic_connection_table.c.from_topic_id).where(
+        topic_connection_table.c.graph_id == "g", topic_connection_table.c.to_topic_id == "t"
+    ),
+    "walk_topics down step": select(topic_connection_table.c.to_topic_id).where(
+        topic_connection_table.c.graph_id == "g", topic_connection_table.c.from_topic_id == "t"
+    ),
+    "create_topic_hierarchy edge exists": select(topic_connection_table.c.id).where(
+        topic_connection_table.c.from_topic_id == "a",
+        topic_connection_table.c.to_topic_id == "b"
+    ),
+    "canonical topic by name": select(canonical_topic_table.c.id).where(
+        canonical_topic_table.c.name == "n"
+    ),
+    "canonical trigram postings": select(topic_trigram_table.c.canonical_id).where(
+        topic_trigram_table.c.trigram == "abc"
+    ),
+    "find_topics by canonical id": select(topic_canonical_table.c.topic_id).where(
+        topic_canonical_table.c.canonical_id == "c"
+    ),
+    "get_frontier": select(learning_frontier_table.c.topic_id).where(
+        learning_frontier_table.c.user_id == "u", learning_frontier_table.c.graph_id == "g"
+    ),
+    "get_user_knowledge": select(user_knowledge_table).where(user_knowledge_table.c.user_id == "u"),
+    "delete_graph closure rows": select(topic_closure_table.c.ancestor_id).where(
+        topic_closure_table.c.graph_id == "g"
+    ),
+}
+
+
+def scans(engine, stmt):
+    """Returns the EXPLAIN QUERY PLAN lines that read a whole table."""
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    # SQLite reports "SCAN <table>" for full scans and "SEARCH ... USING INDEX" otherwise
+    return [row[-1] for row in plan if row[-1].startswith("SCAN")]
+
+
+def full_scans() -> dict:
+    """Hot query name -> its full-scan plan lines, against a fresh in-memory schema."""
+    engine = sa.create_engine("sqlite://")
+    metadata.create_all(engine)
+    return {name: scans(engine, stmt) for name, stmt in HOT_QUERIES.items()}
+
+
+def test_hot_queries_use_indexes():
+    assert {name: bad for name, bad in full_scans().items() if bad} == {}
+
+
+def main():
+    results = full_scans()
+    for name, bad in results.items():
+        print(f"{'FAIL' if bad else 'ok  '} {name}" + (f": {'; '.join(bad)}" if bad else ""))
+    return 1 if any(results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())